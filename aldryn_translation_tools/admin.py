@@ -2,10 +2,16 @@
 
 from __future__ import unicode_literals
 
+from collections import defaultdict
+
 from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.utils import quote
+from django.db.models import BigIntegerField, Case, OuterRef, QuerySet, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
 from django.forms import widgets
 from django.utils.encoding import force_text
-from django.utils.translation import ugettext as _
+from django.utils.translation import ugettext as _, ugettext_lazy
 
 from cms.utils.i18n import get_current_language
 from cms.utils.urlutils import admin_reverse
@@ -85,14 +91,147 @@ class LinkedRelatedInlineMixin(object):
         return readonly_fields
 
 
+class TranslatedInListFilter(admin.SimpleListFilter):
+    """
+    Filters the objects of a translatable model by the language they are
+    translated into, with a subquery on the translations.
+    """
+
+    title = ugettext_lazy('translated in')
+    parameter_name = 'translated_in'
+    # Whether the objects translated, or untranslated, in the language are
+    # kept.
+    translated = True
+
+    def lookups(self, request, model_admin):
+        return settings.LANGUAGES
+
+    def queryset(self, request, queryset):
+        language_code = self.value()
+        if not language_code:
+            return queryset
+        translations_model = queryset.model._parler_meta.root_model
+        translated = translations_model.objects.filter(
+            language_code=language_code).values('master_id')
+        if self.translated:
+            return queryset.filter(pk__in=translated)
+        return queryset.exclude(pk__in=translated)
+
+
+class UntranslatedInListFilter(TranslatedInListFilter):
+    """
+    Filters the objects of a translatable model by a language they are not
+    translated into.
+    """
+
+    title = ugettext_lazy('untranslated in')
+    parameter_name = 'untranslated_in'
+    translated = False
+
+
 class AllTranslationsMixin(object):
 
+    # Placeholder for the pk in the reversed change form URL.
+    change_url_pk_placeholder = '__pk__'
+    # Name of the annotation holding the bitmask of the languages of
+    # `settings.LANGUAGES` each object of the changelist is translated into.
+    all_translations_mask_annotation = 'all_translations_mask'
+
     @property
     def media(self):
         return super(AllTranslationsMixin, self).media + widgets.Media(
             css={'all': ('css/admin/all-translations-mixin.css', ), }
         )
 
+    def get_changelist(self, request, **kwargs):
+        """
+        Returns a ChangeList class that prepares the translations of each page
+        of results for all_translations() with a single query.
+        """
+        ChangeList = super(
+            AllTranslationsMixin, self).get_changelist(request, **kwargs)
+        return type(
+            str('AllTranslations{0}'.format(ChangeList.__name__)),
+            (AllTranslationsChangeListMixin, ChangeList), {})
+
+    def get_change_url_template(self):
+        """
+        Returns the change form URL of the model, with
+        `change_url_pk_placeholder` in place of the pk.
+        """
+        return admin_reverse(
+            '{app_label}_{model_name}_change'.format(
+                app_label=self.model._meta.app_label.lower(),
+                model_name=self.model.__name__.lower(),
+            ), args=(self.change_url_pk_placeholder, )
+        )
+
+    def annotate_all_translations(self, queryset):
+        """
+        Annotates the objects of the queryset with the bitmask of the
+        languages they are translated into, computed in SQL, from which
+        all_translations() renders the tags without any further query. Bit `i`
+        is set if the object is translated into the `i`th language of
+        `settings.LANGUAGES`. The queryset is returned unchanged if there are
+        too many languages for a 64 bits integer.
+        """
+        if len(settings.LANGUAGES) > 63:
+            return queryset
+        translations_model = self.model._parler_meta.root_model
+        bits = [When(language_code=code, then=Value(1 << index))
+                for index, (code, name) in enumerate(settings.LANGUAGES)]
+        # Each language is translated once per object, so the sum of the
+        # bits of its translations is their bitmask.
+        mask = translations_model.objects.filter(
+            master_id=OuterRef('pk'),
+        ).order_by().values('master_id').annotate(
+            mask=Sum(Case(*bits, default=Value(0),
+                          output_field=BigIntegerField())),
+        ).values('mask')
+        return queryset.annotate(**{
+            self.all_translations_mask_annotation: Coalesce(
+                Subquery(mask, output_field=BigIntegerField()), Value(0)),
+        })
+
+    def get_languages_from_mask(self, mask):
+        """
+        Returns the language codes of the bitmask made by
+        annotate_all_translations().
+        """
+        return [code for index, (code, name) in enumerate(settings.LANGUAGES)
+                if mask & (1 << index)]
+
+    def prepare_all_translations(self, objects):
+        """
+        Fetches the available languages of all the given objects with a single
+        query, unless they were annotated by annotate_all_translations(), and
+        reverses the change form URL once, for all_translations().
+        """
+        objects = [obj for obj in objects if obj.pk is not None]
+        if not objects:
+            return
+        url_template = self.get_change_url_template()
+        mask_name = self.all_translations_mask_annotation
+        available = defaultdict(list)
+        unmasked = [obj.pk for obj in objects
+                    if getattr(obj, mask_name, None) is None]
+        if unmasked:
+            translations_model = self.model._parler_meta.root_model
+            translations = translations_model.objects.filter(
+                master_id__in=unmasked,
+            ).values_list('master_id', 'language_code')
+            for master_id, language_code in translations:
+                available[master_id].append(language_code)
+        for obj in objects:
+            mask = getattr(obj, mask_name, None)
+            if mask is not None:
+                available[obj.pk] = self.get_languages_from_mask(mask)
+            obj._all_translations = (
+                available[obj.pk],
+                url_template.replace(
+                    self.change_url_pk_placeholder, quote(force_text(obj.pk))),
+            )
+
     def all_translations(self, obj):
         """
         Adds a property to the list_display that lists all translations with
@@ -103,7 +242,9 @@ class AllTranslationsMixin(object):
         A similar capability is in HVAD, and now there is this for
         Parler-based projects.
         """
-        available = list(obj.get_available_languages())
+        if getattr(obj, '_all_translations', None) is None:
+            self.prepare_all_translations([obj])
+        available, change_form_url = obj._all_translations
         current = get_current_language()
         langs = []
         for code, lang_name in settings.LANGUAGES:
@@ -116,12 +257,6 @@ class AllTranslationsMixin(object):
                 title += " (translated)"
             else:
                 title += " (untranslated)"
-            change_form_url = admin_reverse(
-                '{app_label}_{model_name}_change'.format(
-                    app_label=obj._meta.app_label.lower(),
-                    model_name=obj.__class__.__name__.lower(),
-                ), args=(obj.id, )
-            )
             link = '<a class="{classes}" href="{url}?language={code}" title="{title}">{code}</a>'.format(
                 classes=' '.join(classes),
                 url=change_form_url,
@@ -144,3 +279,32 @@ class AllTranslationsMixin(object):
         if 'all_translations' not in list_display:
             list_display = list(list_display) + ['all_translations', ]
         return list_display
+
+    def get_list_filter(self, request):
+        """
+        Unless they are already in the list_filter list, append the filters
+        by translated and untranslated language.
+        """
+        list_filter = super(AllTranslationsMixin, self).get_list_filter(request)
+        for language_filter in [TranslatedInListFilter,
+                                UntranslatedInListFilter]:
+            if language_filter not in list_filter:
+                list_filter = list(list_filter) + [language_filter]
+        return list_filter
+
+
+class AllTranslationsChangeListMixin(object):
+    """
+    Prepares the translations of the page of results for
+    AllTranslationsMixin.all_translations().
+    """
+
+    def get_results(self, request):
+        super(AllTranslationsChangeListMixin, self).get_results(request)
+        # Only the page is annotated, counting the results does not need the
+        # bitmasks.
+        if isinstance(self.result_list, QuerySet):
+            self.result_list = self.model_admin.annotate_all_translations(
+                self.result_list)
+        # Evaluates the page, the same instances are rendered afterwards.
+        self.model_admin.prepare_all_translations(self.result_list)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers of the async counterparts of the mixins and utils, e.g.
+`utils.aget_object_from_request()`. Needs Python 3.
+
+The supported Django versions have no async ORM, so the async counterparts
+run their queries in a pool of database threads. Whenever they can answer
+without querying the database, e.g. from prefetched translations or the
+objects memoized on the request, they do so without leaving the event loop.
+"""
+
+from __future__ import unicode_literals
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.dispatch import receiver
+from django.utils.translation import get_language, override
+
+
+# The executor of the database threads, see get_database_executor().
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+@receiver(setting_changed)
+def clear_database_executor(**kwargs):
+    if kwargs['setting'] == 'ALDRYN_TRANSLATION_TOOLS_ASYNC_MAX_WORKERS':
+        executor = _executors.pop('executor', None)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def get_database_executor():
+    """
+    Return the executor running the queries of the async counterparts, with
+    `settings.ALDRYN_TRANSLATION_TOOLS_ASYNC_MAX_WORKERS` threads (default:
+    the number of CPUs plus 4, at most 32). Each thread keeps its own
+    database connections, which are closed like the ones of requests,
+    according to CONN_MAX_AGE.
+    """
+    try:
+        return _executors['executor']
+    except KeyError:
+        pass
+    with _executors_lock:
+        if 'executor' not in _executors:
+            max_workers = getattr(
+                settings, 'ALDRYN_TRANSLATION_TOOLS_ASYNC_MAX_WORKERS', None)
+            if max_workers is None:
+                max_workers = min(32, (os.cpu_count() or 1) + 4)
+            _executors['executor'] = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix='aldryn_translation_tools')
+        return _executors['executor']
+
+
+def _close_old_connections():
+    # Like django.db.close_old_connections(), but leaves the connections in a
+    # transaction alone, e.g. the ones shared by the tests.
+    for connection in connections.all():
+        if not connection.in_atomic_block:
+            connection.close_if_unusable_or_obsolete()
+
+
+def _call(language, func, args, kwargs):
+    _close_old_connections()
+    try:
+        with override(language):
+            return func(*args, **kwargs)
+    finally:
+        _close_old_connections()
+
+
+def run_in_database_thread(func, *args, **kwargs):
+    """
+    Return an awaitable of the result of `func(*args, **kwargs)`, called in
+    a database thread with the language active in the calling thread.
+    """
+    return asyncio.get_event_loop().run_in_executor(
+        get_database_executor(),
+        partial(_call, get_language(), func, args, kwargs))
+
+
+def completed(result):
+    """
+    Return an awaitable of `result`, for answers known without querying the
+    database.
+    """
+    future = asyncio.get_event_loop().create_future()
+    future.set_result(result)
+    return future
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from aldryn_translation_tools.models import TranslatedAutoSlugifyMixin
+from aldryn_translation_tools.registry import SlugReservation
+
+
+class Command(BaseCommand):
+    help = (
+        'Reserves the slugs of the existing objects of models using '
+        'TranslatedAutoSlugifyMixin in the slug registry, and releases the '
+        'slugs they no longer use.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*', metavar='app_label.ModelName',
+            help='Models to backfill (default: all the models with '
+                 'slug_use_registry = True).')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of objects processed per transaction.')
+        parser.add_argument(
+            '--clear', action='store_true', default=False,
+            help='Delete all the reservations of the models first, including '
+                 'those of objects that were deleted without signals.')
+
+    def handle(self, *args, **options):
+        if options['models']:
+            models = []
+            for label in options['models']:
+                try:
+                    model = apps.get_model(label)
+                except (LookupError, ValueError) as e:
+                    raise CommandError(str(e))
+                if not issubclass(model, TranslatedAutoSlugifyMixin):
+                    raise CommandError(
+                        '{0} does not use TranslatedAutoSlugifyMixin'.format(
+                            label))
+                models.append(model)
+        else:
+            models = [
+                model for model in apps.get_models()
+                if issubclass(model, TranslatedAutoSlugifyMixin)
+                if model.slug_use_registry
+            ]
+        for model in models:
+            self.backfill(model, options['batch_size'], options['clear'])
+
+    def backfill(self, model, batch_size, clear):
+        if clear:
+            SlugReservation.objects.filter(
+                content_type=ContentType.objects.get_for_model(model),
+            ).delete()
+        pks = model._base_manager.order_by('pk').values_list('pk', flat=True)
+        count = 0
+        conflicts = 0
+        batch = list(pks[:batch_size])
+        while batch:
+            try:
+                with transaction.atomic():
+                    model.update_slug_registry(batch)
+            except IntegrityError:
+                # Some slugs are reserved by other objects already, reserve
+                # the slugs of the other objects one by one.
+                for pk in batch:
+                    try:
+                        with transaction.atomic():
+                            model.update_slug_registry([pk])
+                    except IntegrityError:
+                        conflicts += 1
+                        self.stderr.write(
+                            'The slugs of {0} {1} are reserved by other '
+                            'objects'.format(model._meta.label, pk))
+            count += len(batch)
+            batch = list(pks.filter(pk__gt=batch[-1])[:batch_size])
+        self.stdout.write(
+            'Reserved the slugs of {0} objects of {1} ({2} conflicts)'.format(
+                count - conflicts, model._meta.label, conflicts))
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import multiprocessing
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import six
+from django.utils.encoding import force_text
+
+from aldryn_translation_tools.models import TranslatedAutoSlugifyMixin
+from aldryn_translation_tools.slugifiers import python_slugify, slugify_many
+from aldryn_translation_tools.utils import invalidate_object_cache, write_atomic
+
+
+# Number of slugs changed per UPDATE statement, which takes three query
+# parameters per slug.
+UPDATE_BATCH_SIZE = 250
+
+
+def uses_default_slugify(model):
+    """
+    Return whether the model makes its ideal slugs with the slugifier, so
+    that they can be made in worker processes from the slug sources.
+    """
+    for name in ['_get_ideal_slug', 'slugify']:
+        method = six.get_unbound_function(getattr(model, name))
+        default = six.get_unbound_function(
+            getattr(TranslatedAutoSlugifyMixin, name))
+        if method is not default:
+            return False
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        'Regenerates the slugs of the translations of models using '
+        'TranslatedAutoSlugifyMixin from their sources, e.g. after changing '
+        'slug_source_field_name, slug_separator or the slug max length. The '
+        'translations are processed per language, in chunks ordered by pk, '
+        'and the changed slugs are written with bulk updates.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='+', metavar='app_label.ModelName',
+            help='Models to regenerate the slugs of.')
+        parser.add_argument(
+            '--languages', nargs='+', default=None,
+            help='Languages to regenerate the slugs in (default: all the '
+                 'languages the model is translated into).')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of translations processed per transaction.')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of processes slugifying the sources (default: 1, '
+                 'in this process).')
+        parser.add_argument(
+            '--checkpoint', default=None, metavar='PATH',
+            help='JSON file recording the progress after each chunk. When it '
+                 'exists, the command resumes from it. Delete it to start '
+                 'over.')
+        parser.add_argument(
+            '--dry-run', action='store_true', default=False,
+            help='Only report the slugs that would change. Collisions are '
+                 'checked against the current slugs, so later chunks may get '
+                 'different slugs in the actual run.')
+
+    def handle(self, *args, **options):
+        models = []
+        for label in options['models']:
+            try:
+                model = apps.get_model(label)
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e))
+            if not issubclass(model, TranslatedAutoSlugifyMixin):
+                raise CommandError(
+                    '{0} does not use TranslatedAutoSlugifyMixin'.format(label))
+            models.append(model)
+
+        self.options = options
+        self.checkpoint = {}
+        if options['checkpoint'] and not options['dry_run']:
+            try:
+                with open(options['checkpoint']) as checkpoint_file:
+                    self.checkpoint = json.load(checkpoint_file)
+            except IOError:
+                pass
+            except ValueError:
+                raise CommandError('Invalid checkpoint file: {0}'.format(
+                    options['checkpoint']))
+
+        self.pool = None
+        if options['workers'] > 1:
+            self.pool = multiprocessing.Pool(options['workers'])
+        try:
+            for model in models:
+                meta = model._parler_meta._get_extension_by_field(
+                    model.slug_field_name)
+                languages = options['languages'] or list(
+                    meta.model.objects.order_by('language_code').values_list(
+                        'language_code', flat=True).distinct())
+                for language in languages:
+                    self.regenerate(model, meta, language)
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
+
+    def regenerate(self, model, meta, language):
+        label = model._meta.label
+        progress = self.checkpoint.setdefault(label, {}).get(language, {})
+        if progress.get('done'):
+            self.stdout.write(
+                'Skipped {0} in {1}, done according to the checkpoint'.format(
+                    label, language))
+            return
+        translations = meta.model.objects.filter(
+            language_code=language).order_by('pk')
+        batch_size = self.options['batch_size']
+        last_pk = progress.get('last_pk')
+        # The translations which did not get their ideal slug.
+        retry = [tuple(entry) for entry in progress.get('retry', [])]
+        count = 0
+        changed = set()
+        while True:
+            chunk = translations
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            chunk = list(chunk.values_list('pk', 'master_id')[:batch_size])
+            if not chunk:
+                break
+            with transaction.atomic():
+                changed.update(self.regenerate_chunk(
+                    model, meta, language, chunk, retry))
+            count += len(chunk)
+            last_pk = chunk[-1][0]
+            self.save_checkpoint(label, language, last_pk=last_pk,
+                                 retry=retry)
+        if not self.options['dry_run']:
+            # The slugs they got instead may have been taken by the former
+            # slugs of the translations of later chunks, which were changed
+            # since. Regenerate them once more, so that running the command
+            # again changes nothing.
+            for start in range(0, len(retry), batch_size):
+                with transaction.atomic():
+                    changed.update(self.regenerate_chunk(
+                        model, meta, language,
+                        retry[start:start + batch_size]))
+        self.save_checkpoint(label, language, last_pk=last_pk, done=True)
+        self.stdout.write(
+            '{verb} {changed} of the {count} slugs of {label} in '
+            '{language}'.format(
+                verb='Would change' if self.options['dry_run'] else 'Changed',
+                changed=len(changed), count=count, label=label,
+                language=language))
+
+    def regenerate_chunk(self, model, meta, language, chunk, retry=None):
+        """
+        Regenerates the slugs of a chunk of (pk, master_id) translations, and
+        returns the pks of the translations whose slug changed. The
+        translations which did not get their ideal slug are appended to
+        `retry`, if given.
+        """
+        objects = model._base_manager.filter(
+            pk__in=[master_id for pk, master_id in chunk],
+        ).prefetch_related(*[extension.rel_name
+                             for extension in model._parler_meta])
+        objects = dict((obj.pk, obj) for obj in objects)
+        objects = [objects[master_id] for pk, master_id in chunk]
+        old_slugs = []
+        for obj in objects:
+            obj.set_current_language(language)
+            old_slugs.append(obj._get_existing_slug())
+
+        ideal_slugs = self.get_ideal_slugs(model, objects)
+        for obj, slug in zip(objects, ideal_slugs):
+            setattr(obj, model.slug_field_name, slug)
+        model.assign_slugs(objects, language)
+
+        changes = []
+        for (pk, master_id), obj, old_slug, ideal_slug in zip(
+                chunk, objects, old_slugs, ideal_slugs):
+            slug = obj._get_existing_slug()
+            if slug != old_slug:
+                changes.append((pk, master_id, old_slug, slug))
+            if slug != ideal_slug and retry is not None:
+                retry.append((pk, master_id))
+        if self.options['verbosity'] > 1 or self.options['dry_run']:
+            for pk, master_id, old_slug, slug in changes:
+                self.stdout.write('{0} {1} {2}: {3} -> {4}'.format(
+                    model._meta.label, master_id, language, old_slug, slug))
+        changed = [pk for pk, master_id, old_slug, slug in changes]
+        if self.options['dry_run'] or not changes:
+            return changed
+
+        field = meta.model._meta.get_field(model.slug_field_name)
+        for start in range(0, len(changes), UPDATE_BATCH_SIZE):
+            batch = changes[start:start + UPDATE_BATCH_SIZE]
+            meta.model.objects.filter(
+                pk__in=[pk for pk, master_id, old_slug, slug in batch],
+            ).update(**{model.slug_field_name: Case(
+                *[When(pk=pk, then=Value(slug))
+                  for pk, master_id, old_slug, slug in batch],
+                output_field=field
+            )})
+        if model.slug_use_registry:
+            model.update_slug_registry(
+                [master_id for pk, master_id, old_slug, slug in changes])
+        if model.slug_keep_history:
+            model.record_slug_history(
+                (master_id, language, old_slug)
+                for pk, master_id, old_slug, slug in changes if old_slug)
+        # The updates bypass the signals invalidating the cached objects.
+        invalidate_object_cache(model)
+        return changed
+
+    def get_ideal_slugs(self, model, objects):
+        """
+        Returns the ideal slugs of the objects, like _get_ideal_slug(), with
+        the slugification done by the worker processes, if any.
+        """
+        if self.pool is None or not uses_default_slugify(model):
+            return [obj._get_ideal_slug() for obj in objects]
+        sources = [obj.get_slug_source() for obj in objects]
+        items = []
+        for obj, source in zip(objects, sources):
+            if source:
+                items.append((
+                    force_text(source), obj.get_slug_max_length(),
+                    obj.word_boundary, obj.save_order, obj.slug_separator))
+        slugifier = getattr(
+            settings, 'ALDRYN_TRANSLATION_TOOLS_SLUGIFIER', python_slugify)
+        workers = self.options['workers']
+        size = max(len(items) // workers, 1)
+        slugs = iter([
+            slug
+            for batch in self.pool.map(
+                partial(slugify_many, slugifier=slugifier),
+                [items[start:start + size]
+                 for start in range(0, len(items), size)])
+            for slug in batch
+        ])
+        ideal_slugs = []
+        for obj, source in zip(objects, sources):
+            if source:
+                slug = force_text(next(slugs))
+            else:
+                slug = force_text(obj.get_slug_default())
+            ideal_slugs.append(slug[:obj.get_slug_max_length()])
+        return ideal_slugs
+
+    def save_checkpoint(self, label, language, **progress):
+        if not self.options['checkpoint'] or self.options['dry_run']:
+            return
+        self.checkpoint[label][language] = progress
+        write_atomic(self.options['checkpoint'], [
+            json.dumps(self.checkpoint, indent=2, sort_keys=True)])
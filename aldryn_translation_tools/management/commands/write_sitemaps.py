@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import os
+
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.encoding import force_text
+from django.utils.module_loading import import_string
+
+from aldryn_translation_tools.sitemaps import I18NSitemap, render_sitemap_index, render_urlset
+from aldryn_translation_tools.utils import write_atomic
+
+
+INDEX_FILE_NAME = 'sitemap.xml'
+STATE_FILE_NAME = '.sitemaps.json'
+
+
+class Command(BaseCommand):
+    help = (
+        'Writes the pages of every section of the given sitemaps as static, '
+        'gzip-compressed sitemap files, along with a sitemap index, to a '
+        'directory served by the web server. Sections whose latest lastmod, '
+        'number of items, protocol and domain did not change since the '
+        'previous run are not regenerated.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sitemaps',
+            help='Dotted path to the dict of sitemaps, as passed to the '
+                 'sitemap view, e.g. "myproject.sitemaps.sitemaps".')
+        parser.add_argument(
+            'output_dir', help='Directory to write the sitemap files to.')
+        parser.add_argument(
+            'base_url',
+            help='URL the output directory is served at, e.g. '
+                 '"https://example.com/sitemaps/".')
+        parser.add_argument(
+            '--protocol', default=None,
+            help='Protocol of the URLs in the sitemaps (default: http).')
+        parser.add_argument(
+            '--domain', default=None,
+            help='Domain of the URLs in the sitemaps (default: the domain of '
+                 'the current Site).')
+        parser.add_argument(
+            '--force', action='store_true', default=False,
+            help='Regenerate all sections, changed or not.')
+
+    def handle(self, *args, **options):
+        try:
+            sitemaps = import_string(options['sitemaps'])
+        except ImportError as e:
+            raise CommandError(force_text(e))
+        output_dir = options['output_dir']
+        base_url = options['base_url']
+        if not base_url.endswith('/'):
+            base_url += '/'
+        if options['domain']:
+            site = Site(domain=options['domain'], name=options['domain'])
+        else:
+            site = Site.objects.get_current()
+        if not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+
+        state_path = os.path.join(output_dir, STATE_FILE_NAME)
+        state = self.read_state(state_path)
+        new_state = {}
+        index = []
+        for section, sitemap in sorted(sitemaps.items()):
+            if os.sep in section or section.startswith('.'):
+                raise CommandError(
+                    'Invalid sitemap section name: {0}'.format(section))
+            if callable(sitemap):
+                sitemap = sitemap()
+            lastmod = self.get_latest_lastmod(sitemap)
+            paginator = sitemap.paginator
+            # Changing the protocol or domain changes every URL.
+            watermark = [
+                force_text(lastmod) if lastmod is not None else None,
+                paginator.count,
+                options['protocol'] or sitemap.protocol,
+                site.domain,
+            ]
+            files = ['{0}-{1}.xml.gz'.format(section, page)
+                     for page in paginator.page_range]
+
+            previous = state.get(section, {})
+            if options['force'] or lastmod is None:
+                unchanged = False
+            elif previous.get('watermark') != watermark:
+                unchanged = False
+            else:
+                unchanged = all(
+                    os.path.exists(os.path.join(output_dir, file_name))
+                    for file_name in files)
+            if unchanged:
+                self.stdout.write(
+                    'Skipped unchanged section {0}'.format(section))
+            else:
+                for page, file_name in zip(paginator.page_range, files):
+                    if isinstance(sitemap, I18NSitemap):
+                        urls = sitemap.iter_urls(
+                            page, site=site, protocol=options['protocol'])
+                    else:
+                        urls = sitemap.get_urls(
+                            page, site=site, protocol=options['protocol'])
+                    write_atomic(os.path.join(output_dir, file_name),
+                                 render_urlset(urls), compress=True)
+                self.stdout.write('Wrote section {0} ({1} files)'.format(
+                    section, len(files)))
+
+            new_state[section] = {'watermark': watermark, 'files': files}
+            index.extend(
+                (base_url + file_name, lastmod) for file_name in files)
+
+        write_atomic(os.path.join(output_dir, INDEX_FILE_NAME),
+                     render_sitemap_index(index))
+        write_atomic(state_path,
+                     [json.dumps(new_state, indent=2, sort_keys=True)])
+
+        # Remove the files of sections or pages that no longer exist.
+        current_files = set(
+            file_name
+            for section_state in new_state.values()
+            for file_name in section_state['files'])
+        for section_state in state.values():
+            for file_name in section_state.get('files', []):
+                path = os.path.join(output_dir, file_name)
+                if file_name not in current_files and os.path.exists(path):
+                    os.remove(path)
+
+    def get_latest_lastmod(self, sitemap):
+        get_latest_lastmod = getattr(sitemap, 'get_latest_lastmod', None)
+        if get_latest_lastmod is None:
+            return None
+        return get_latest_lastmod()
+
+    def read_state(self, path):
+        try:
+            with open(path) as state_file:
+                return json.load(state_file)
+        except (IOError, ValueError):
+            return {}
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from django.db.models import Case, IntegerField, OuterRef, Subquery, Value, When
+
+from cms.utils.i18n import get_current_language, get_default_language
+
+from parler.managers import TranslatableManager, TranslatableQuerySet
+
+from .utils import get_fallback_chain
+
+
+class TranslationHelperQuerySetMixin(object):
+    """
+    Queryset methods for models using TranslationHelperMixin, to be mixed
+    into their TranslatableQuerySet.
+    """
+
+    def prefetch_translations(self, *fields):
+        """
+        Prefetches the translations holding the given fields (by default, all
+        translated fields), so that known_translation_getter() and
+        bulk_known_translation_getter() run no further queries, whatever the
+        fallbacks.
+        """
+        parler_meta = self.model._parler_meta
+        if fields:
+            metas = [parler_meta._get_extension_by_field(field)
+                     for field in fields]
+        else:
+            metas = list(parler_meta)
+        rel_names = []
+        for meta in metas:
+            if meta.rel_name not in rel_names:
+                rel_names.append(meta.rel_name)
+        return self.prefetch_related(*rel_names)
+
+    def with_known_translation(self, field, language_code=None, name=None):
+        """
+        Annotates each object with the value of the translated `field` in the
+        first language of the fallback chain of `language_code` (as defined in
+        `settings.CMS_LANGUAGES`) the object is translated into, like
+        known_translation_getter(), as `name` (default: "known_<field>"), and
+        with that language as "<name>_language". Both are None when there is
+        no suitable translation.
+
+        The values are resolved by the database, in the same query, so they
+        can be used to filter and order the objects.
+        """
+        language_code = (
+            language_code or get_current_language() or get_default_language())
+        chain = get_fallback_chain(language_code)
+        if name is None:
+            name = 'known_{0}'.format(field)
+        meta = self.model._parler_meta._get_extension_by_field(field)
+        rank = Case(
+            *[When(language_code=language, then=Value(index))
+              for index, language in enumerate(chain.languages)],
+            output_field=IntegerField()
+        )
+        translations = meta.model._default_manager.filter(
+            master=OuterRef('pk'),
+            language_code__in=chain.languages,
+        ).annotate(fallback_rank=rank).order_by('fallback_rank')
+        return self.annotate(**{
+            name: Subquery(translations.values(field)[:1]),
+            '{0}_language'.format(name): Subquery(
+                translations.values('language_code')[:1]),
+        })
+
+
+class TranslationHelperQuerySet(TranslationHelperQuerySetMixin,
+                                TranslatableQuerySet):
+    pass
+
+
+class TranslationHelperManager(TranslatableManager):
+    queryset_class = TranslationHelperQuerySet
+
+    def prefetch_translations(self, *fields):
+        return self.get_queryset().prefetch_translations(*fields)
+
+    def with_known_translation(self, field, language_code=None, name=None):
+        return self.get_queryset().with_known_translation(
+            field, language_code, name)
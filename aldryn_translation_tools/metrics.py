@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import socket
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from timeit import default_timer
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections, router
+from django.dispatch import receiver
+from django.utils import six
+from django.utils.encoding import force_bytes
+from django.utils.module_loading import import_string
+
+
+# The metrics backend in use, see get_metrics_backend().
+_backends = {}
+
+
+@receiver(setting_changed)
+def clear_metrics_backend(**kwargs):
+    if kwargs['setting'] in ('ALDRYN_TRANSLATION_TOOLS_METRICS_BACKEND',
+                             'ALDRYN_TRANSLATION_TOOLS_METRICS_OPTIONS'):
+        _backends.clear()
+
+
+class BaseMetricsBackend(object):
+    """
+    Receives the metrics reported by the mixins. Each metric has a name and
+    a dict of tags, e.g. the model and language.
+
+    Backends with `enabled = False` are not called at all, and the mixins do
+    not collect any metrics for them.
+    """
+
+    enabled = True
+
+    def increment(self, name, value=1, tags=None):
+        """
+        Add `value` to the counter `name`.
+        """
+        raise NotImplementedError
+
+    def observe(self, name, value, tags=None):
+        """
+        Record a value of the distribution `name`, e.g. a number of queries.
+        """
+        raise NotImplementedError
+
+    def timing(self, name, milliseconds, tags=None):
+        """
+        Record the duration of the operation `name`.
+        """
+        raise NotImplementedError
+
+
+class NullMetricsBackend(BaseMetricsBackend):
+    """
+    Discards all metrics. This is the default.
+    """
+
+    enabled = False
+
+    def increment(self, name, value=1, tags=None):
+        pass
+
+    def observe(self, name, value, tags=None):
+        pass
+
+    def timing(self, name, milliseconds, tags=None):
+        pass
+
+
+class InMemoryMetricsBackend(BaseMetricsBackend):
+    """
+    Keeps all metrics in memory as (kind, name, value, tags) tuples in
+    `records`, e.g. for tests.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.lock = threading.Lock()
+
+    def record(self, kind, name, value, tags):
+        with self.lock:
+            self.records.append((kind, name, value, dict(tags or {})))
+
+    def increment(self, name, value=1, tags=None):
+        self.record('counter', name, value, tags)
+
+    def observe(self, name, value, tags=None):
+        self.record('distribution', name, value, tags)
+
+    def timing(self, name, milliseconds, tags=None):
+        self.record('timing', name, milliseconds, tags)
+
+    def get_values(self, name, **tags):
+        """
+        Return the values recorded for `name` whose tags include `tags`.
+        """
+        return [
+            value for kind, record_name, value, record_tags in self.records
+            if record_name == name and all(
+                record_tags.get(key) == tag for key, tag in tags.items())
+        ]
+
+    def clear(self):
+        with self.lock:
+            del self.records[:]
+
+
+class StatsDMetricsBackend(BaseMetricsBackend):
+    """
+    Sends the metrics to a StatsD server over UDP, as counters (`c`),
+    histograms (`h`) and timers (`ms`). Set `tag_format` to 'dogstatsd' to
+    append the tags to each metric, as supported by DogStatsD and the
+    Prometheus statsd_exporter, otherwise they are dropped.
+
+    `sink` (a callable or its dotted path) receives each formatted metric
+    instead of the server, e.g. `list.append` in tests.
+    """
+
+    def __init__(self, host='localhost', port=8125,
+                 prefix='aldryn_translation_tools', tag_format=None,
+                 sink=None):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.tag_format = tag_format
+        if isinstance(sink, six.string_types):
+            sink = import_string(sink)
+        self.sink = sink
+        self.socket = None
+
+    def format(self, name, value, kind, tags):
+        if self.prefix:
+            name = '{0}.{1}'.format(self.prefix, name)
+        line = '{0}:{1}|{2}'.format(name, value, kind)
+        if tags and self.tag_format == 'dogstatsd':
+            line += '|#' + ','.join(
+                '{0}:{1}'.format(key, tags[key]) for key in sorted(tags))
+        return line
+
+    def send(self, line):
+        if self.sink is not None:
+            self.sink(line)
+            return
+        if self.socket is None:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.socket.sendto(force_bytes(line), self.address)
+        except socket.error:
+            # Metrics must never break the application.
+            pass
+
+    def increment(self, name, value=1, tags=None):
+        self.send(self.format(name, value, 'c', tags))
+
+    def observe(self, name, value, tags=None):
+        self.send(self.format(name, value, 'h', tags))
+
+    def timing(self, name, milliseconds, tags=None):
+        self.send(self.format(
+            name, '{0:.3f}'.format(milliseconds), 'ms', tags))
+
+
+def get_metrics_backend():
+    """
+    Return the metrics backend set in
+    `settings.ALDRYN_TRANSLATION_TOOLS_METRICS_BACKEND` (the dotted path of a
+    BaseMetricsBackend subclass, default: NullMetricsBackend), instantiated
+    with the keyword arguments in
+    `settings.ALDRYN_TRANSLATION_TOOLS_METRICS_OPTIONS`.
+    """
+    try:
+        return _backends['backend']
+    except KeyError:
+        pass
+    backend_class = getattr(
+        settings, 'ALDRYN_TRANSLATION_TOOLS_METRICS_BACKEND',
+        NullMetricsBackend)
+    if isinstance(backend_class, six.string_types):
+        backend_class = import_string(backend_class)
+    options = getattr(settings, 'ALDRYN_TRANSLATION_TOOLS_METRICS_OPTIONS', {})
+    backend = _backends['backend'] = backend_class(**options)
+    return backend
+
+
+def get_metrics_tags(obj, language=None):
+    """
+    Return the tags of the metrics about `obj`: its model, and the given
+    language or its current language.
+    """
+    if language is None and hasattr(obj, 'get_current_language'):
+        language = obj.get_current_language()
+    return {'model': obj._meta.label_lower, 'language': language}
+
+
+class QueryCounter(object):
+    """
+    A database execute wrapper counting the queries run through it.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_logged_queries(connection, counter):
+    """
+    Count the queries run on `connection` within the block in `counter`,
+    from the queries logged by a debug cursor, for Django < 2.0, which has no
+    execute wrappers. The queries are only kept in `connection.queries` if
+    they were logged anyway, e.g. with DEBUG = True.
+    """
+    logged = connection.queries_logged
+    queries_log = connection.queries_log
+    force_debug_cursor = connection.force_debug_cursor
+    connection.queries_log = deque(maxlen=connection.queries_limit)
+    connection.force_debug_cursor = True
+    try:
+        yield counter
+    finally:
+        counter.count = len(connection.queries_log)
+        if logged:
+            queries_log.extend(connection.queries_log)
+        connection.queries_log = queries_log
+        connection.force_debug_cursor = force_debug_cursor
+
+
+@contextmanager
+def count_queries(connection):
+    """
+    Count the queries run on `connection` within the block in the
+    QueryCounter it returns.
+    """
+    counter = QueryCounter()
+    if hasattr(connection, 'execute_wrapper'):
+        with connection.execute_wrapper(counter):
+            yield counter
+    else:
+        with count_logged_queries(connection, counter):
+            yield counter
+
+
+def instrument(name, write=False):
+    """
+    Decorate a method of a model mixin to report its duration as the timing
+    `name`, and the number of queries it ran on the model's database as the
+    distribution `name.queries`, tagged with the model and the current
+    language of the object. Does nothing but call the method when the
+    metrics backend is disabled.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            backend = get_metrics_backend()
+            if not backend.enabled:
+                return method(self, *args, **kwargs)
+            tags = get_metrics_tags(self)
+            if write:
+                using = kwargs.get('using') or router.db_for_write(
+                    self.__class__, instance=self)
+            else:
+                using = router.db_for_read(self.__class__, instance=self)
+            start = default_timer()
+            with count_queries(connections[using]) as counter:
+                result = method(self, *args, **kwargs)
+            backend.observe(name + '.queries', counter.count, tags)
+            backend.timing(name, (default_timer() - start) * 1000, tags)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlugReservation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField(verbose_name='object id')),
+                ('scope', models.CharField(blank=True, max_length=15, verbose_name='scope')),
+                ('slug', models.CharField(max_length=255, verbose_name='slug')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType', verbose_name='content type')),
+            ],
+            options={
+                'verbose_name': 'slug reservation',
+                'verbose_name_plural': 'slug reservations',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='slugreservation',
+            unique_together={('content_type', 'scope', 'slug')},
+        ),
+        migrations.AlterIndexTogether(
+            name='slugreservation',
+            index_together={('content_type', 'object_id')},
+        ),
+    ]
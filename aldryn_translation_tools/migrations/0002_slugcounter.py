@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('aldryn_translation_tools', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlugCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(blank=True, max_length=15, verbose_name='scope')),
+                ('slug', models.CharField(max_length=255, verbose_name='slug')),
+                ('next_index', models.PositiveIntegerField(verbose_name='next index')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType', verbose_name='content type')),
+            ],
+            options={
+                'verbose_name': 'slug counter',
+                'verbose_name_plural': 'slug counters',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='slugcounter',
+            unique_together={('content_type', 'scope', 'slug')},
+        ),
+    ]
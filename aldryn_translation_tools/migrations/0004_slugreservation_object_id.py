@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aldryn_translation_tools', '0003_slughistory'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='slugreservation',
+            name='object_id',
+            field=models.CharField(max_length=255, verbose_name='object id'),
+        ),
+    ]
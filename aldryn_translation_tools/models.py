@@ -2,15 +2,37 @@
 
 from __future__ import unicode_literals
 
-from django.conf import settings
+import re
+from itertools import islice
+
+from django.apps import apps
 from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, router, transaction
+from django.db.models import Q, prefetch_related_objects
+from django.db.models.constants import LOOKUP_SEP
+from django.utils import six
 from django.utils.encoding import force_text
-from django.utils.translation import ugettext_lazy as _
+from django.utils.translation import get_language, ugettext_lazy as _
 
-from cms.utils.i18n import get_current_language, get_default_language, get_fallback_languages
+from cms.utils.i18n import get_current_language, get_default_language
 
+from parler.cache import is_missing
+from parler.utils.context import switch_language
 from slugify import slugify
 
+from .metrics import get_metrics_backend, get_metrics_tags, instrument
+from .slugifiers import get_slugifier
+from .utils import get_fallback_chain
+
+
+# Characters that have to be escaped when building a slug pattern for the
+# database's regular expression lookup.
+REGEX_SPECIAL_CHARACTERS = re.compile(r'([.^$*+?()\[\]{}|\\])')
+
+
+def escape_regex(text):
+    return REGEX_SPECIAL_CHARACTERS.sub(r'\\\1', text)
+
 
 class TranslatedAutoSlugifyMixin(object):
     """
@@ -50,12 +72,58 @@ class TranslatedAutoSlugifyMixin(object):
     # filters that would be used to determine slug uniqueness, would be
     # populated with slug_field_name.
     raw_slug_filter_string = 'translations__{0}'
+    # If True, make_new_slug() fetches all slugs that may collide with the
+    # candidates in a single query instead of checking each candidate index
+    # separately with `_slug_exists()`.
+    slug_prefetch_collisions = False
+    # The number of index digits for which colliding slugs are prefetched.
+    # Candidates with longer indexes are checked with `_slug_exists()`.
+    slug_prefetch_index_length = 6
+    # The number of distinct slugs looked up per query by `assign_slugs()`.
+    slug_prefetch_batch_size = 100
+    # If True, slugs are checked against, and reserved in, the SlugReservation
+    # registry, which needs `aldryn_translation_tools` in INSTALLED_APPS.
+    # Reservations for existing objects are made with the
+    # `backfill_slug_registry` management command.
+    slug_use_registry = False
+    # The number of slugs tried when saving with `slug_use_registry`, if the
+    # slugs found free are reserved by concurrent saves in the meantime.
+    slug_allocation_attempts = 10
+    # Store of the next index to use per slug, e.g. LRUSlugCounters(), see
+    # `aldryn_translation_tools.slug_counters`. When set, make_new_slug()
+    # only checks the candidate at the stored index before scanning them.
+    slug_counters = None
+    # If True, the former slugs of the objects are recorded in the SlugHistory
+    # table when they change, and get_object_from_request() falls back to
+    # them. This needs `aldryn_translation_tools` in INSTALLED_APPS.
+    slug_keep_history = False
 
     # python-slugify option for smart truncate
     word_boundary = False
     # python-slugify option for smart truncate
     save_order = True
 
+    # Values determined by introspection, per class. See `_get_slug_meta()`.
+    _slug_meta_cache = {}
+
+    def _get_slug_meta(self, name, depends_on, compute):
+        """
+        Return the introspected value `name` for this class, calling
+        `compute()` only if it is not cached yet, or if any of the objects in
+        `depends_on` (typically class attributes) was replaced since.
+        """
+        key = (self.__class__, name)
+        try:
+            cached_depends_on, value = self._slug_meta_cache[key]
+        except KeyError:
+            pass
+        else:
+            if all(a is b for a, b in zip(cached_depends_on, depends_on)):
+                return value
+        value = compute()
+        self._slug_meta_cache[key] = (depends_on, value)
+        return value
+
     def get_slug_default(self):
         """
         Naively constructs a translated default slug from the object. For
@@ -66,6 +134,14 @@ class TranslatedAutoSlugifyMixin(object):
         Example: If your model is "news article" and your source field is
         "title" this will return "news-article-without-title".
         """
+        # Lazy translated strings evaluate differently per language.
+        return self._get_slug_meta(
+            ('slug_default', get_language()),
+            (self.slug_default, self.slug_source_field_name),
+            self._build_slug_default,
+        )
+
+    def _build_slug_default(self):
         if self.slug_default:
             # Implementing class provides its own, translated string, use it.
             return force_text(self.slug_default)
@@ -95,15 +171,32 @@ class TranslatedAutoSlugifyMixin(object):
         if self.slug_max_length:
             slug_max_length = self.slug_max_length
         else:
-            trans_meta = self.translations.model._meta
-            slug_field = trans_meta.get_field(self.slug_field_name)
-            max_length = getattr(slug_field, 'max_length', 255)
             # All objects of this class will use the same value.
-            slug_max_length = max_length
+            slug_max_length = self._get_slug_meta(
+                'slug_max_length',
+                (self.slug_field_name, ),
+                self._build_slug_max_length,
+            )
         if idx_len:
             return slug_max_length - len(self.slug_separator) - idx_len
         return slug_max_length
 
+    def _build_slug_max_length(self):
+        trans_meta = self.translations.model._meta
+        slug_field = trans_meta.get_field(self.slug_field_name)
+        return getattr(slug_field, 'max_length', 255)
+
+    def _get_slug_filter(self):
+        """
+        Build the lookup of the slug field used to check slug uniqueness from
+        `raw_slug_filter_string` and `slug_field_name`.
+        """
+        return self._get_slug_meta(
+            'slug_filter',
+            (self.raw_slug_filter_string, self.slug_field_name),
+            lambda: self.raw_slug_filter_string.format(self.slug_field_name),
+        )
+
     def get_slug_source(self):
         """
         Simply returns the value of the slug source field. Override for more
@@ -128,11 +221,11 @@ class TranslatedAutoSlugifyMixin(object):
         """
         if max_length is None:
             max_length = self.get_slug_max_length()
-        slug = slugify(text,
-                       max_length=max_length,
-                       word_boundary=self.word_boundary,
-                       save_order=self.save_order,
-                       separator=self.slug_separator)
+        slug = get_slugifier()(text,
+                               max_length=max_length,
+                               word_boundary=self.word_boundary,
+                               save_order=self.save_order,
+                               separator=self.slug_separator)
         return slug
 
     def _get_ideal_slug(self):
@@ -168,20 +261,149 @@ class TranslatedAutoSlugifyMixin(object):
             qs = qs.exclude(pk=self.pk)
         return qs
 
+    def _get_slug_scope(self):
+        """
+        Return the scope in which the slug of the current translation must be
+        unique in the slug registry: its language, or '' if slugs are
+        globally unique.
+        """
+        if self.slug_globally_unique:
+            return ''
+        return self.get_current_language() or get_default_language()
+
+    def _get_slug_lookup(self, exclude_pks=None):
+        """
+        Return the queryset and the slug lookup to check slugs against: the
+        slug registry if `slug_use_registry` is True, the translations
+        otherwise. The object itself and the objects with a pk in
+        `exclude_pks` are left out.
+        """
+        if self.slug_use_registry:
+            from django.contrib.contenttypes.models import ContentType
+            from .registry import SlugReservation
+            qs = SlugReservation.objects.filter(
+                content_type=ContentType.objects.get_for_model(self),
+                scope=self._get_slug_scope(),
+            )
+            pks = list(exclude_pks or [])
+            if self.pk:
+                pks.append(self.pk)
+            if pks:
+                qs = qs.exclude(object_id__in=pks)
+            return qs, 'slug'
+        qs = self._get_slug_queryset()
+        if exclude_pks:
+            qs = qs.exclude(pk__in=exclude_pks)
+        return qs, self._get_slug_filter()
+
     def _slug_exists(self, slug, slug_filter=None, qs=None):
         """
         Check if slug exists in the given queryset.
         If slug_filter is None it would be created from
         self.raw_slug_filter_string and self.slug_field_name
+        If both are None, the slug is looked up as per `_get_slug_lookup()`.
         """
 
+        if qs is None and slug_filter is None:
+            qs, slug_filter = self._get_slug_lookup()
         if qs is None:
             qs = self._get_slug_queryset()
         if slug_filter is None:
-            slug_filter = self.raw_slug_filter_string.format(
-                self.slug_field_name)
+            slug_filter = self._get_slug_filter()
         return qs.filter(**{slug_filter: slug}).exists()
 
+    @staticmethod
+    def _get_slug_field_path(qs, slug_filter):
+        """
+        Return the path of the slug field in `slug_filter` if it is a plain
+        field path or an exact lookup, so that the slugs can be selected from
+        `qs`, or None if it ends with another lookup, e.g. `iexact`, in which
+        case each candidate has to be checked with `_slug_exists()`.
+        """
+        lookups, field_parts, _ = qs.query.solve_lookup_type(slug_filter)
+        if lookups and lookups != ['exact']:
+            return None
+        return LOOKUP_SEP.join(field_parts)
+
+    def _get_collision_q(self, slug, field_path):
+        """
+        Build the filter matching, in the slug field at `field_path`, `slug`
+        itself and the candidate slugs made from it with an index of up to
+        `slug_prefetch_index_length` digits, which may be truncated to make
+        room for the index. The prefix they share is also matched with
+        `startswith`, so that an index on the field can be used.
+        """
+        # The slug each index length is appended to, as [slug, min, max]
+        # index lengths. The first indexed candidate is never truncated.
+        bases = [[slug, 1, 1]]
+        for idx_length in range(1, self.slug_prefetch_index_length + 1):
+            # Truncated the same way as in `_get_candidate_slugs()`.
+            base = slug[:self.get_slug_max_length(idx_length)]
+            if base == bases[-1][0]:
+                bases[-1][2] = idx_length
+            else:
+                bases.append([base, idx_length, idx_length])
+        pattern = '^({0})$'.format('|'.join([escape_regex(slug)] + [
+            '{base}{sep}[0-9]{{{min},{max}}}'.format(
+                base=escape_regex(base),
+                sep=escape_regex(self.slug_separator),
+                min=min_length,
+                max=max_length,
+            )
+            for base, min_length, max_length in bases
+        ]))
+        return Q(**{
+            '{0}__startswith'.format(field_path): min(
+                (base for base, min_length, max_length in bases), key=len),
+            '{0}__regex'.format(field_path): pattern,
+        })
+
+    @staticmethod
+    def _fetch_slugs(qs, slug_q, field_path):
+        # Selecting the slugs directly from `qs` would use the first join on
+        # the translations, which is not necessarily the one the slug lookup
+        # was applied to, so select the matching objects in a subquery.
+        matching = qs.filter(slug_q).values('pk')
+        taken = qs.model._base_manager.filter(
+            slug_q, pk__in=matching).values_list(field_path, flat=True)
+        return set(taken)
+
+    def _get_taken_slugs(self, slug, slug_filter=None, qs=None):
+        """
+        Return the set of slugs in the given queryset which may collide with
+        `slug` or its indexed variants, using a single query, or None if the
+        slug filter does not allow selecting them.
+        """
+        if qs is None and slug_filter is None:
+            qs, slug_filter = self._get_slug_lookup()
+        if qs is None:
+            qs = self._get_slug_queryset()
+        if slug_filter is None:
+            slug_filter = self._get_slug_filter()
+        field_path = self._get_slug_field_path(qs, slug_filter)
+        if field_path is None:
+            return None
+        return self._fetch_slugs(
+            qs, self._get_collision_q(slug, field_path), field_path)
+
+    def _get_candidate_slugs(self, slug):
+        """
+        Yield the candidate slugs in the order they should be tried: `slug`
+        itself, then `slug` followed by the separator and an increasing index.
+        The slug is truncated as needed to leave room for the index.
+        """
+        idx = 1
+        candidate = slug
+        max_length = self.get_slug_max_length()
+        yield candidate
+        while True:
+            if len(candidate) > max_length:
+                max_length = self.get_slug_max_length(len(str(idx)))
+            candidate = self._get_candidate_slug(slug[:max_length], idx)
+            idx += 1
+            yield candidate
+
+    @instrument('slug.make_new_slug')
     def make_new_slug(self, slug=None, qs=None):
         """
         Generate a slug that meets requirements.
@@ -195,26 +417,331 @@ class TranslatedAutoSlugifyMixin(object):
         if not slug:
             # Build the "ideal slug" for this object as a starting point
             slug = self._get_ideal_slug()
-        # initial setup
-        idx = 1
-        candidate = slug
-        max_length = self.get_slug_max_length()
+        # The counters are only valid for the default uniqueness check.
+        counters = self.slug_counters if qs is None else None
+        candidate = None
+        start = 0
+        if counters is not None:
+            scope = self._get_slug_scope()
+            idx = counters.get_next_index(self.__class__, scope, slug)
+            if idx and not self._slug_exists(slug):
+                # The slug itself is free, e.g. after the objects using it
+                # were deleted.
+                idx, candidate = 0, slug
+            elif idx:
+                # Only check the candidate following the last one allocated.
+                candidate = next(islice(
+                    self._get_candidate_slugs(slug), idx, None))
+                if self._slug_exists(candidate):
+                    # Another process allocated it, resume the scan from the
+                    # next one rather than from the first candidate.
+                    candidate = None
+                    start = idx + 1
+        if candidate is None:
+            idx, candidate = self._find_free_candidate_slug(slug, qs, start)
+        if counters is not None and idx:
+            counters.set_next_index(self.__class__, scope, slug, idx + 1)
+        metrics = get_metrics_backend()
+        if metrics.enabled:
+            # The number of candidates found to be taken.
+            metrics.observe('slug.collisions', idx, get_metrics_tags(self))
+        return candidate
+
+    def _find_free_candidate_slug(self, slug, qs=None, start=0):
+        """
+        Return the index and the value of the first free candidate slug, from
+        the candidate at index `start`.
+        """
+        candidates = islice(
+            enumerate(self._get_candidate_slugs(slug)), start, None)
+        taken = None
+        if self.slug_prefetch_collisions:
+            taken = self._get_taken_slugs(slug, qs=qs)
+        if taken is not None:
+            # Look up all colliding slugs at once and pick the first unused
+            # candidate from them. Only candidates with an index longer than
+            # the prefetched ones need to be checked separately.
+            for idx, candidate in candidates:
+                if candidate not in taken:
+                    return idx, candidate
+                if len(str(idx + 1)) > self.slug_prefetch_index_length:
+                    break
         # Check if the resulting slug is currently in use, if not, use it.
         # Otherwise, add a separator and an index until we find an
         # unused combination.
-        while self._slug_exists(candidate, qs=qs):
-            if len(candidate) > max_length:
-                max_length = self.get_slug_max_length(len(str(idx)))
-            candidate = self._get_candidate_slug(slug[:max_length], idx)
-            idx += 1
-        return candidate
+        for idx, candidate in candidates:
+            if not self._slug_exists(candidate, qs=qs):
+                return idx, candidate
 
-    def save(self, **kwargs):
+    @classmethod
+    def assign_slugs(cls, objects, language=None):
+        """
+        Assign unique slugs in the given language to all `objects` at once,
+        e.g. before inserting them with `bulk_create()`. Objects keep their
+        existing slug if it is still free, otherwise a new slug is made from
+        it, or from the ideal slug if they have none.
+
+        Collisions are resolved against the database with one query per
+        `slug_prefetch_batch_size` distinct slugs, and against the other
+        objects of the batch in memory. If the slug filter ends with a lookup
+        other than `exact`, each candidate is checked with `_slug_exists()`.
+
+        :param objects: iterable of instances of this model
+        :param language: language of the slugs to assign, if None - the
+                         default language would be used
+        :return (list): the objects
+        """
+        language = language or get_default_language()
+        objects = list(objects)
+        slugs = []
+        for obj in objects:
+            obj.set_current_language(language)
+            slugs.append(obj._get_existing_slug() or obj._get_ideal_slug())
+
+        # An unsaved instance gives the queryset of all the slugs in use.
+        probe = cls()
+        probe.set_current_language(language)
+        qs, slug_filter = probe._get_slug_lookup(
+            exclude_pks=[obj.pk for obj in objects if obj.pk])
+
+        taken = set()
+        field_path = cls._get_slug_field_path(qs, slug_filter)
+        if field_path is not None:
+            distinct_slugs = sorted(set(slugs))
+            size = cls.slug_prefetch_batch_size
+            for start in range(0, len(distinct_slugs), size):
+                slug_q = Q()
+                for slug in distinct_slugs[start:start + size]:
+                    slug_q |= probe._get_collision_q(slug, field_path)
+                taken |= cls._fetch_slugs(qs, slug_q, field_path)
+
+        for obj, slug in zip(objects, slugs):
+            for idx, candidate in enumerate(obj._get_candidate_slugs(slug)):
+                if candidate in taken:
+                    continue
+                prefetched = len(str(idx)) <= cls.slug_prefetch_index_length
+                if field_path is None or not prefetched:
+                    if obj._slug_exists(candidate, slug_filter, qs):
+                        taken.add(candidate)
+                        continue
+                break
+            taken.add(candidate)
+            setattr(obj, obj.slug_field_name, candidate)
+        return objects
+
+    def _get_loaded_translation_values(self):
+        """
+        Return the field values of the current translation as they were
+        loaded from, or last saved to, the database, or None if it is not
+        saved yet.
+        """
+        try:
+            translation = self._get_translated_model()
+        except self.translations.model.DoesNotExist:
+            return None
+        if translation.pk is None:
+            return None
+        # Parler keeps the field values of the translation as they were
+        # loaded, in the same order as its fields.
+        names = [field.get_attname()
+                 for field in translation._meta.get_fields()
+                 if not field.is_relation or field.many_to_one]
+        return dict(zip(names, translation._original_values))
+
+    def _slug_has_changed(self):
+        """
+        Check whether the slug of the current translation, or the translated
+        field it is derived from, changed since the translation was loaded
+        from, or last saved to, the database.
+        """
+        loaded = self._get_loaded_translation_values()
+        if loaded is None:
+            return True
+        if loaded.get(self.slug_field_name) != self._get_existing_slug():
+            return True
+        if self.slug_source_field_name in loaded:
+            source = loaded[self.slug_source_field_name]
+            return source != self.get_slug_source()
+        return False
+
+    @instrument('slug.save', write=True)
+    def save(self, force_slug_check=False, **kwargs):
+        """
+        Ensure the object has a unique slug before saving. An existing slug
+        is only checked for uniqueness if it, or its source, changed since the
+        translation was loaded, unless `force_slug_check` is True.
+        """
         slug = self._get_existing_slug()
-        if not slug or self._slug_exists(slug):
+        if not slug:
+            needs_new_slug = True
+        elif force_slug_check or self._slug_has_changed():
+            needs_new_slug = self._slug_exists(slug)
+        else:
+            needs_new_slug = False
+        if needs_new_slug:
             slug = self.make_new_slug(slug=slug)
             setattr(self, self.slug_field_name, slug)
-        return super(TranslatedAutoSlugifyMixin, self).save(**kwargs)
+        former_slug = None
+        if self.slug_keep_history:
+            loaded = self._get_loaded_translation_values() or {}
+            former_slug = loaded.get(self.slug_field_name)
+            if former_slug == slug:
+                former_slug = None
+        if not self.slug_use_registry and not former_slug:
+            return super(TranslatedAutoSlugifyMixin, self).save(**kwargs)
+        using = kwargs.get('using') or router.db_for_write(
+            self.__class__, instance=self)
+        with transaction.atomic(using=using):
+            result = super(TranslatedAutoSlugifyMixin, self).save(**kwargs)
+            if self.slug_use_registry:
+                self._reserve_slugs(using)
+            if former_slug:
+                self.record_slug_history([(
+                    self.pk, self.get_current_language(), former_slug)])
+        return result
+
+    def _aslug_exists(self, slug, slug_filter=None, qs=None):
+        """
+        Async counterpart of `_slug_exists()`, returning an awaitable of the
+        result. Needs Python 3.
+        """
+        from .async_utils import run_in_database_thread
+        return run_in_database_thread(self._slug_exists, slug, slug_filter, qs)
+
+    def amake_new_slug(self, slug=None, qs=None):
+        """
+        Async counterpart of make_new_slug(), returning an awaitable of the
+        slug. All the candidates are checked in a single trip to a database
+        thread, see `async_utils.run_in_database_thread()`. Needs Python 3.
+        """
+        from .async_utils import run_in_database_thread
+        return run_in_database_thread(self.make_new_slug, slug, qs)
+
+    def asave(self, force_slug_check=False, **kwargs):
+        """
+        Async counterpart of save(), returning an awaitable. The slug checks,
+        the collision resolution and the queries saving the object run in a
+        single trip to a database thread, so that the transaction saving the
+        object and reserving its slugs is not split across threads. Needs
+        Python 3.
+        """
+        from .async_utils import run_in_database_thread
+        return run_in_database_thread(
+            self.save, force_slug_check=force_slug_check, **kwargs)
+
+    def _reserve_slugs(self, using):
+        """
+        Reserve the slugs of the object in the slug registry. The unique index
+        of the registry makes sure concurrent saves never get the same slug:
+        when a slug was reserved by another object after it was checked, the
+        next candidate slug is tried in the languages of the conflicting
+        slugs, up to `slug_allocation_attempts` times.
+        """
+        attempt = 1
+        while True:
+            try:
+                with transaction.atomic(using=using):
+                    self.update_slug_registry([self.pk])
+                return
+            except IntegrityError:
+                if attempt >= self.slug_allocation_attempts:
+                    raise
+            attempt += 1
+            for language in self._get_conflicting_slug_languages():
+                with switch_language(self, language):
+                    slug = self.make_new_slug(slug=self._get_existing_slug())
+                    setattr(self, self.slug_field_name, slug)
+                    self.save_translation(self._get_translated_model())
+
+    def _get_conflicting_slug_languages(self):
+        """
+        Return the languages of the saved translations of the object whose
+        slug is reserved by another object in the slug registry.
+        """
+        from django.contrib.contenttypes.models import ContentType
+        from .registry import SlugReservation
+        translations = self._parler_meta.root_model._default_manager.filter(
+            master_id=self.pk,
+        ).exclude(**{self.slug_field_name: ''}).values_list(
+            'language_code', self.slug_field_name)
+        languages = {}
+        for language_code, slug in translations:
+            scope = '' if self.slug_globally_unique else language_code
+            languages.setdefault((scope, slug), []).append(language_code)
+        if not languages:
+            return []
+        conflicts = SlugReservation.objects.filter(
+            content_type=ContentType.objects.get_for_model(self),
+            scope__in=set(scope for scope, slug in languages),
+            slug__in=set(slug for scope, slug in languages),
+        ).exclude(object_id=self.pk).values_list('scope', 'slug')
+        return sorted(
+            language_code
+            for key in set(conflicts) if key in languages
+            for language_code in languages[key]
+        )
+
+    @classmethod
+    def update_slug_registry(cls, pks):
+        """
+        Reserve the slugs of all the translations of the objects with the
+        given pks in the slug registry, and release the slugs they no longer
+        use. Raises IntegrityError if a slug is reserved by another object.
+        """
+        from django.contrib.contenttypes.models import ContentType
+        from .registry import SlugReservation
+        pks = list(pks)
+        content_type = ContentType.objects.get_for_model(cls)
+        translations = cls._parler_meta.root_model._default_manager.filter(
+            master_id__in=pks,
+        ).values_list('master_id', 'language_code', cls.slug_field_name)
+        wanted = set()
+        for object_id, language_code, slug in translations:
+            if slug:
+                scope = '' if cls.slug_globally_unique else language_code
+                wanted.add((force_text(object_id), scope, slug))
+
+        reservations = SlugReservation.objects.filter(
+            content_type=content_type, object_id__in=pks)
+        existing = {}
+        for values in reservations.values_list(
+                'pk', 'object_id', 'scope', 'slug'):
+            existing[values[1:]] = values[0]
+        stale = [pk for key, pk in existing.items() if key not in wanted]
+        if stale:
+            SlugReservation.objects.filter(pk__in=stale).delete()
+        SlugReservation.objects.bulk_create(
+            SlugReservation(content_type=content_type, object_id=object_id,
+                            scope=scope, slug=slug)
+            for object_id, scope, slug in wanted - set(existing)
+        )
+
+    @classmethod
+    def record_slug_history(cls, entries):
+        """
+        Record the (pk, language, slug) entries, former slugs of objects, in
+        the slug history, replacing the entries of other objects for the same
+        slugs.
+        """
+        from django.contrib.contenttypes.models import ContentType
+        from .registry import SlugHistory
+        content_type = ContentType.objects.get_for_model(cls)
+        wanted = {}
+        for object_id, language, slug in entries:
+            scope = '' if cls.slug_globally_unique else language
+            wanted[(scope, slug)] = object_id
+        slugs_by_scope = {}
+        for scope, slug in wanted:
+            slugs_by_scope.setdefault(scope, []).append(slug)
+        for scope, slugs in slugs_by_scope.items():
+            SlugHistory.objects.filter(
+                content_type=content_type, scope=scope, slug__in=slugs,
+            ).delete()
+        SlugHistory.objects.bulk_create(
+            SlugHistory(content_type=content_type, object_id=object_id,
+                        scope=scope, slug=slug)
+            for (scope, slug), object_id in wanted.items()
+        )
 
 
 class TranslationHelperMixin(object):
@@ -227,35 +754,171 @@ class TranslationHelperMixin(object):
         and the language it represents as a tuple: (value, language).
 
         If no suitable language is found, then it returns (default, None)
+
+        When the translations were prefetched (see
+        `TranslationHelperQuerySetMixin.prefetch_translations()`), they are
+        used directly and no query is made.
         """
         # NOTE: We're using the CMS fallbacks here, rather than the Parler
         # fallbacks, the developer should ensure that their project's Parler
         # settings match the CMS settings.
-        try:
-            object_languages = self.get_available_languages()
-            assert hasattr(object_languages, '__iter__')
-        except [KeyError, AssertionError]:
-            raise ImproperlyConfigured(
-                "TranslationHelperMixin must be used with a model defining"
-                "get_available_languages() that returns a list of available"
-                "language codes. E.g., django-parler's TranslatableModel.")
-
         language_code = (
             language_code or get_current_language() or get_default_language())
-        site_id = getattr(settings, 'SITE_ID', None)
-        languages = [language_code] + get_fallback_languages(
-            language_code, site_id=site_id)
-
-        # Grab the first language that is common to our list of fallbacks and
-        # the list of available languages for this object.
-        if languages and object_languages:
-            language_code = next(
-                (lang for lang in languages if lang in object_languages), None)
-
-            if language_code:
+        chain = get_fallback_chain(language_code)
+        return self._known_translation_getter(
+            field, default, language_code, chain,
+            self._get_prefetched_known_translation(field, chain))
+
+    @instrument('translation.known_translation_getter')
+    def _known_translation_getter(self, field, default, language_code, chain,
+                                  known):
+        """
+        Implement known_translation_getter() for the fallback `chain` of
+        `language_code`, given the result of
+        `_get_prefetched_known_translation()`.
+        """
+        metrics = get_metrics_backend()
+        if known is not None:
+            available_language, translation = known
+            value = getattr(translation, field, default)
+        else:
+            try:
+                object_languages = self.get_available_languages()
+                assert hasattr(object_languages, '__iter__')
+            except [KeyError, AssertionError]:
+                raise ImproperlyConfigured(
+                    "TranslationHelperMixin must be used with a model defining"
+                    "get_available_languages() that returns a list of available"
+                    "language codes. E.g., django-parler's TranslatableModel.")
+
+            # Grab the first language that is common to our list of fallbacks
+            # and the list of available languages for this object.
+            available_language = None
+            if object_languages:
+                available_language = chain.first_available(object_languages)
+            if available_language:
                 value = self.safe_translation_getter(field,
-                                                     default=default, language_code=language_code)
-                return value, language_code
+                                                     default=default, language_code=available_language)
+
+        if available_language:
+            if metrics.enabled:
+                metrics.observe(
+                    'translation.fallback_depth',
+                    chain.ranks[available_language],
+                    get_metrics_tags(self, language_code))
+            return value, available_language
 
         # No suitable translation exists
+        if metrics.enabled:
+            metrics.increment('translation.fallback_misses',
+                              tags=get_metrics_tags(self, language_code))
         return default, None
+
+    def aknown_translation_getter(self, field, default=None,
+                                  language_code=None, any_language=False):
+        """
+        Async counterpart of known_translation_getter(), returning an
+        awaitable of the (value, language) tuple. When the translations were
+        prefetched, the result is computed without leaving the event loop,
+        otherwise the translation is fetched in a database thread, see
+        `async_utils.run_in_database_thread()`. Needs Python 3.
+        """
+        from .async_utils import completed, run_in_database_thread
+        language_code = (
+            language_code or get_current_language() or get_default_language())
+        chain = get_fallback_chain(language_code)
+        known = self._get_prefetched_known_translation(field, chain)
+        if known is not None:
+            return completed(self._known_translation_getter(
+                field, default, language_code, chain, known))
+        return run_in_database_thread(
+            self._known_translation_getter, field, default, language_code,
+            chain, None)
+
+    def _get_prefetched_known_translation(self, field, chain):
+        """
+        Return the (language, translation) of the translation holding `field`
+        in the most preferred language of the fallback chain, among the
+        prefetched translations, or (None, None) if none is in the chain.
+        Returns None if the translations were not prefetched.
+        """
+        meta = self._parler_meta._get_extension_by_field(field)
+        prefetched = self._get_prefetched_translations(meta=meta)
+        if prefetched is None:
+            return None
+        ranks = chain.ranks
+        known = None
+        known_rank = None
+        for translation in prefetched:
+            rank = ranks.get(translation.language_code)
+            if rank is not None and (known_rank is None or rank < known_rank):
+                known = translation
+                known_rank = rank
+        if known is None:
+            return None, None
+        language = known.language_code
+        # The loaded translation may have unsaved changes.
+        cached = self._translations_cache[meta.model].get(language)
+        if cached is not None and not is_missing(cached):
+            known = cached
+        return language, known
+
+    @classmethod
+    def bulk_known_translation_getter(cls, objects, fields, default=None,
+                                      language_code=None):
+        """
+        Acts like known_translation_getter() for many objects and fields at
+        once. The translations of all objects are fetched with a single query
+        per translations model (unless they were prefetched already) and a
+        single fallback chain is used for all of them.
+
+        Returns a list with a dict per object, in the same order as
+        `objects`, mapping each field to its (value, language) tuple.
+        """
+        if isinstance(fields, six.string_types):
+            fields = [fields]
+        objects = list(objects)
+        metas = []
+        for field in fields:
+            meta = cls._parler_meta._get_extension_by_field(field)
+            if meta not in metas:
+                metas.append(meta)
+        for meta in metas:
+            prefetch_related_objects(
+                [obj for obj in objects
+                 if obj._get_prefetched_translations(meta=meta) is None],
+                meta.rel_name,
+            )
+
+        language_code = (
+            language_code or get_current_language() or get_default_language())
+        chain = get_fallback_chain(language_code)
+
+        metrics = get_metrics_backend()
+        results = []
+        for obj in objects:
+            values = {}
+            for field in fields:
+                language, translation = obj._get_prefetched_known_translation(
+                    field, chain)
+                if metrics.enabled:
+                    tags = get_metrics_tags(obj, language_code)
+                    if language:
+                        metrics.observe('translation.fallback_depth',
+                                        chain.ranks[language], tags)
+                    else:
+                        metrics.increment(
+                            'translation.fallback_misses', tags=tags)
+                if language:
+                    value = getattr(translation, field, default)
+                else:
+                    value = default
+                values[field] = (value, language)
+            results.append(values)
+        return results
+
+
+if apps.is_installed('aldryn_translation_tools'):
+    # Unlike the mixins, the models of the slug registry and counters need
+    # the app in INSTALLED_APPS.
+    from . import registry  # noqa: F401
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+from functools import partial
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils.encoding import python_2_unicode_compatible
+from django.utils.translation import ugettext_lazy as _
+
+from parler.models import TranslatedFieldsModel
+
+
+@python_2_unicode_compatible
+class SlugReservation(models.Model):
+    """
+    A slug in use by an object of a model using TranslatedAutoSlugifyMixin
+    with `slug_use_registry = True`, in the scope where it must be unique.
+    """
+
+    content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, verbose_name=_('content type'))
+    # The pk of the object as text, so that any type of pk can be stored.
+    object_id = models.CharField(_('object id'), max_length=255)
+    # The language of the slug, or '' for globally unique slugs.
+    scope = models.CharField(_('scope'), max_length=15, blank=True)
+    slug = models.CharField(_('slug'), max_length=255)
+
+    class Meta:
+        verbose_name = _('slug reservation')
+        verbose_name_plural = _('slug reservations')
+        unique_together = (('content_type', 'scope', 'slug'), )
+        index_together = (('content_type', 'object_id'), )
+
+    def __str__(self):
+        return '{0}:{1}'.format(self.scope, self.slug)
+
+
+@python_2_unicode_compatible
+class SlugCounter(models.Model):
+    """
+    The next index to use for colliding slugs of a model, in the scope where
+    they must be unique, for DatabaseSlugCounters.
+    """
+
+    content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, verbose_name=_('content type'))
+    # The language of the slug, or '' for globally unique slugs.
+    scope = models.CharField(_('scope'), max_length=15, blank=True)
+    slug = models.CharField(_('slug'), max_length=255)
+    next_index = models.PositiveIntegerField(_('next index'))
+
+    class Meta:
+        verbose_name = _('slug counter')
+        verbose_name_plural = _('slug counters')
+        unique_together = (('content_type', 'scope', 'slug'), )
+
+    def __str__(self):
+        return '{0}:{1}'.format(self.scope, self.slug)
+
+
+@python_2_unicode_compatible
+class SlugHistory(models.Model):
+    """
+    A former slug of an object of a model using TranslatedAutoSlugifyMixin
+    with `slug_keep_history = True`, in the scope where it was unique, so
+    that the URLs using it can still be resolved.
+    """
+
+    content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, verbose_name=_('content type'))
+    object_id = models.PositiveIntegerField(_('object id'))
+    # The language of the slug, or '' for globally unique slugs.
+    scope = models.CharField(_('scope'), max_length=15, blank=True)
+    slug = models.CharField(_('slug'), max_length=255)
+
+    class Meta:
+        verbose_name = _('slug history entry')
+        verbose_name_plural = _('slug history')
+        unique_together = (('content_type', 'scope', 'slug'), )
+        index_together = (('content_type', 'object_id'), )
+
+    def __str__(self):
+        return '{0}:{1}'.format(self.scope, self.slug)
+
+
+# The objects whose translations were deleted, as {model: pks}, and the
+# deleted objects, as (model, pk), for each database, see `release_slugs()`.
+_pending_updates = threading.local()
+
+
+def update_pending_slug_registries(using):
+    updated, deleted = _pending_updates.__dict__.pop(using, ({}, set()))
+    for model, pks in updated.items():
+        pks = [pk for pk in pks if (model, pk) not in deleted]
+        if pks:
+            model.update_slug_registry(pks)
+
+
+def _add_pending_update(using, model, pk, deleted=False):
+    updated, deleted_objects = _pending_updates.__dict__.setdefault(
+        using, ({}, set()))
+    if deleted:
+        deleted_objects.add((model, pk))
+    else:
+        updated.setdefault(model, set()).add(pk)
+    # Only the first callback run after the commit finds pending updates.
+    transaction.on_commit(
+        partial(update_pending_slug_registries, using), using=using)
+
+
+@receiver(post_delete)
+def release_slugs(sender, instance, using, **kwargs):
+    """
+    Release the slugs of deleted objects and translations from the slug
+    registry, and forget the former slugs of deleted objects.
+
+    The reservations of an object whose translations are deleted are updated
+    once for all of them, when the transaction is committed, and not at all
+    if the object itself is deleted too.
+    """
+    from .models import TranslatedAutoSlugifyMixin
+    if isinstance(instance, TranslatedAutoSlugifyMixin):
+        for enabled, model in [(instance.slug_use_registry, SlugReservation),
+                               (instance.slug_keep_history, SlugHistory)]:
+            if enabled:
+                model.objects.filter(
+                    content_type=ContentType.objects.get_for_model(instance),
+                    object_id=instance.pk,
+                ).delete()
+        if instance.slug_use_registry:
+            # Its translations may be deleted after it.
+            _add_pending_update(using, instance._meta.concrete_model,
+                                instance.pk, deleted=True)
+    elif isinstance(instance, TranslatedFieldsModel):
+        model = instance._meta.get_field('master').related_model
+        if not issubclass(model, TranslatedAutoSlugifyMixin):
+            return
+        if model.slug_use_registry and model._parler_meta.root_model is sender:
+            _add_pending_update(using, model, instance.master_id)
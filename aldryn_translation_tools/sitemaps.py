@@ -2,10 +2,25 @@
 
 from __future__ import unicode_literals
 
+from itertools import chain, islice
+
+from django.apps import apps
 from django.conf import settings
 from django.contrib.sitemaps import Sitemap
+from django.contrib.sitemaps.views import x_robots_tag
+from django.contrib.sites.shortcuts import get_current_site
+from django.core.exceptions import ImproperlyConfigured
+from django.core.paginator import EmptyPage, PageNotAnInteger
+from django.db.models import prefetch_related_objects
+from django.http import Http404, StreamingHttpResponse
 from django.urls import NoReverseMatch
-from django.utils import translation
+from django.utils import dateformat, translation
+from django.utils.html import escape
+
+
+# Number of items processed at once by I18NSitemap.iter_urls(), unless the
+# sitemap sets its chunk_size.
+DEFAULT_CHUNK_SIZE = 500
 
 
 class I18NSitemap(Sitemap):
@@ -38,8 +53,23 @@ class I18NSitemap(Sitemap):
         }
 
     Continue as normal.
+
+    For very large sitemaps, set `chunk_size` or `prefetch_related` (e.g. to
+    `('translations', )`), or use the `streaming_sitemap` view instead of
+    Django's: the items of the requested page are then fetched with
+    `.iterator()`, and processed `chunk_size` items at a time, each chunk
+    getting its relations prefetched with a single query per relation.
+    Otherwise, get_urls() works as Sitemap.get_urls().
     """
 
+    # Number of items processed at once by iter_urls(), None for
+    # DEFAULT_CHUNK_SIZE. Setting it makes get_urls() use iter_urls().
+    chunk_size = None
+    # Relations to prefetch for each chunk of items, besides the ones
+    # prefetched by the queryset of items(). Setting them makes get_urls()
+    # use iter_urls().
+    prefetch_related = ()
+
     def __init__(self, language=None):
         """
         Override's Sitemap's constructor to accept a language code as
@@ -53,10 +83,250 @@ class I18NSitemap(Sitemap):
         Overrides Sitemap.location() to utilise the language set in
         self.language.
         """
+        if translation.get_language() == self.language:
+            return self._get_location(item)
         with translation.override(self.language):
+            return self._get_location(item)
+
+    def _get_location(self, item):
+        try:
+            return item.get_absolute_url()
+        except NoReverseMatch:  # pragma: no cover
+            # Note, if we did our job right in items(), this
+            # shouldn't happen at all, but just in case...
+            return ''
+
+    def get_latest_lastmod(self):
+        """
+        Return the latest lastmod of all items, or None if unknown. This is
+        used by the write_sitemaps management command to skip regenerating
+        unchanged sitemaps. Override it to compute the value efficiently,
+        e.g. with an aggregate query on the items.
+        """
+        lastmod = getattr(self, 'lastmod', None)
+        if callable(lastmod):
+            return None
+        return lastmod
+
+    def get_urls(self, page=1, site=None, protocol=None):
+        if self.chunk_size is None and not self.prefetch_related:
+            return super(I18NSitemap, self).get_urls(
+                page, site=site, protocol=protocol)
+        urls = list(self.iter_urls(page, site=site, protocol=protocol))
+        lastmods = [url['lastmod'] for url in urls]
+        if lastmods and None not in lastmods:
+            self.latest_lastmod = max(lastmods)
+        return urls
+
+    def iter_urls(self, page=1, site=None, protocol=None):
+        """
+        Return an iterator over the URL entries of the given page, in the
+        format of Sitemap.get_urls(). The page is validated immediately.
+        """
+        if self.protocol is not None:
+            protocol = self.protocol
+        if site is None and apps.is_installed('django.contrib.sites'):
+            Site = apps.get_model('sites', 'Site')
             try:
-                return item.get_absolute_url()
-            except NoReverseMatch:  # pragma: no cover
-                # Note, if we did our job right in items(), this
-                # shouldn't happen at all, but just in case...
-                return ''
+                site = Site.objects.get_current()
+            except Site.DoesNotExist:
+                pass
+        if site is None:
+            raise ImproperlyConfigured(
+                "To use sitemaps, either enable the sites framework or pass "
+                "a Site/RequestSite object in your view."
+            )
+        object_list = self.paginator.page(page).object_list
+        return self._iter_urls(object_list, protocol or 'http', site.domain)
+
+    def _iter_urls(self, object_list, protocol, domain):
+        lookups = list(self.prefetch_related)
+        if hasattr(object_list, 'iterator'):
+            # iterator() ignores the prefetches of the queryset, so they are
+            # done per chunk instead.
+            lookups = list(object_list._prefetch_related_lookups) + lookups
+            object_list = object_list.iterator()
+        chunk_size = self.chunk_size or DEFAULT_CHUNK_SIZE
+        while True:
+            # Only activate the language while processing a chunk, so it does
+            # not leak to the consumer between two items.
+            with translation.override(self.language):
+                chunk = list(islice(object_list, chunk_size))
+                if not chunk:
+                    return
+                if lookups:
+                    prefetch_related_objects(chunk, *lookups)
+                urls = self._get_chunk_urls(chunk, protocol, domain)
+            for url in urls:
+                yield url
+
+    def _get_chunk_urls(self, chunk, protocol, domain):
+        return [self._get_url_info(item, protocol, domain) for item in chunk]
+
+    def _get_attribute(self, name, item):
+        attr = getattr(self, name, None)
+        if callable(attr):
+            return attr(item)
+        return attr
+
+    def _get_url_info(self, item, protocol, domain):
+        priority = self._get_attribute('priority', item)
+        return {
+            'item': item,
+            'location': '{0}://{1}{2}'.format(
+                protocol, domain, self._get_attribute('location', item)),
+            'lastmod': self._get_attribute('lastmod', item),
+            'changefreq': self._get_attribute('changefreq', item),
+            'priority': str(priority if priority is not None else ''),
+        }
+
+
+class I18NAlternatesSitemap(I18NSitemap):
+    """
+    A translated sitemap listing the items in all the given languages at
+    once, instead of using one I18NSitemap per language. The items are walked
+    once and each of their translations gets an entry, with alternate links
+    to the other translations of the item, so use it with the
+    `streaming_sitemap` view, which renders these.
+
+        class ThingsSitemap(I18NAlternatesSitemap):
+
+            def items(self):
+                return Thing.objects.translated(*self.languages).distinct()
+
+        sitemaps = {
+            'things': ThingsSitemap(),  # or ThingsSitemap(['en', 'fr']),
+        }
+
+    The languages of an item are taken from its prefetched translations, see
+    `get_item_languages()`.
+    """
+
+    prefetch_related = ('translations', )
+
+    def __init__(self, languages=None):
+        if languages is None:
+            languages = [code for code, name in settings.LANGUAGES]
+        super(I18NAlternatesSitemap, self).__init__(languages[0])
+        self.languages = list(languages)
+        # Every item may have an entry per language.
+        self.limit = max(self.limit // len(self.languages), 1)
+
+    def location(self, item):
+        # The language is activated for each item by _get_chunk_urls().
+        return self._get_location(item)
+
+    def get_item_languages(self, item):
+        """
+        Return the languages the item is translated into.
+        """
+        return item.get_available_languages()
+
+    def _get_chunk_urls(self, chunk, protocol, domain):
+        available = [set(self.get_item_languages(item)) for item in chunk]
+        alternates = [[] for item in chunk]
+        urls = []
+        for language in self.languages:
+            with translation.override(language):
+                for index, item in enumerate(chunk):
+                    if language not in available[index]:
+                        continue
+                    if hasattr(item, 'set_current_language'):
+                        item.set_current_language(language)
+                    url = self._get_url_info(item, protocol, domain)
+                    url['language'] = language
+                    url['alternates'] = alternates[index]
+                    alternates[index].append({
+                        'language': language,
+                        'location': url['location'],
+                    })
+                    urls.append(url)
+        return urls
+
+
+def render_urlset(urls):
+    """
+    Render the URL entries, as returned by Sitemap.get_urls(), as a sitemap
+    XML document, piece by piece.
+    """
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+        'xmlns:xhtml="http://www.w3.org/1999/xhtml">\n'
+    )
+    for url in urls:
+        parts = ['<url><loc>{0}</loc>'.format(escape(url['location']))]
+        for alternate in url.get('alternates', ()):
+            parts.append(
+                '<xhtml:link rel="alternate" hreflang="{0}" href="{1}"/>'
+                ''.format(escape(alternate['language']),
+                          escape(alternate['location'])))
+        if url['lastmod']:
+            parts.append('<lastmod>{0}</lastmod>'.format(
+                dateformat.format(url['lastmod'], 'Y-m-d')))
+        if url['changefreq']:
+            parts.append('<changefreq>{0}</changefreq>'.format(
+                escape(url['changefreq'])))
+        if url['priority']:
+            parts.append('<priority>{0}</priority>'.format(
+                escape(url['priority'])))
+        parts.append('</url>\n')
+        yield ''.join(parts)
+    yield '</urlset>\n'
+
+
+def render_sitemap_index(sitemaps):
+    """
+    Render a sitemap index XML document, piece by piece, from an iterable of
+    (location, lastmod) tuples, where lastmod may be None.
+    """
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    )
+    for location, lastmod in sitemaps:
+        parts = ['<sitemap><loc>{0}</loc>'.format(escape(location))]
+        if lastmod:
+            parts.append('<lastmod>{0}</lastmod>'.format(
+                dateformat.format(lastmod, 'Y-m-d')))
+        parts.append('</sitemap>\n')
+        yield ''.join(parts)
+    yield '</sitemapindex>\n'
+
+
+@x_robots_tag
+def streaming_sitemap(request, sitemaps, section=None,
+                      content_type='application/xml'):
+    """
+    A replacement for django.contrib.sitemaps.views.sitemap, which streams
+    the sitemap instead of rendering it in memory. I18NSitemaps are iterated
+    in chunks, other sitemaps are rendered as usual.
+    """
+    req_protocol = request.scheme
+    req_site = get_current_site(request)
+
+    if section is not None:
+        if section not in sitemaps:
+            raise Http404("No sitemap available for section: %r" % section)
+        maps = [sitemaps[section]]
+    else:
+        maps = sitemaps.values()
+    page = request.GET.get("p", 1)
+
+    urls = []
+    for site in maps:
+        if callable(site):
+            site = site()
+        try:
+            if isinstance(site, I18NSitemap):
+                urls.append(site.iter_urls(
+                    page=page, site=req_site, protocol=req_protocol))
+            else:
+                urls.append(site.get_urls(
+                    page=page, site=req_site, protocol=req_protocol))
+        except EmptyPage:
+            raise Http404("Page %s empty" % page)
+        except PageNotAnInteger:
+            raise Http404("No page '%s'" % page)
+    return StreamingHttpResponse(
+        render_urlset(chain.from_iterable(urls)), content_type=content_type)
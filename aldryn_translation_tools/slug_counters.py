@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.utils.encoding import force_bytes
+
+from .utils import LRUCache
+
+
+class BaseSlugCounters(object):
+    """
+    A store of the next index to use for the colliding slugs of each model
+    using TranslatedAutoSlugifyMixin, per scope (the language of the slugs, or
+    '' for globally unique slugs) and slug. Set an instance as the
+    `slug_counters` of the model.
+
+    The indexes are only hints: the slug at the stored index is checked
+    before being used, so stores do not need to be exact, or shared between
+    processes.
+    """
+
+    def get_next_index(self, model, scope, slug):
+        """
+        Return the next index to use for the slug, or None if unknown.
+        """
+        raise NotImplementedError
+
+    def set_next_index(self, model, scope, slug, index):
+        """
+        Store the next index to use for the slug, unless a higher one is
+        stored already.
+        """
+        raise NotImplementedError
+
+
+class LRUSlugCounters(BaseSlugCounters):
+    """
+    Keeps the indexes of the `max_size` most recently used slugs in memory,
+    in each process.
+    """
+
+    def __init__(self, max_size=10000):
+        self.counters = LRUCache(max_size)
+
+    def get_next_index(self, model, scope, slug):
+        return self.counters.get((model, scope, slug))
+
+    def set_next_index(self, model, scope, slug, index):
+        key = (model, scope, slug)
+        current = self.counters.get(key)
+        if current is None or current < index:
+            self.counters.set(key, index)
+
+
+class CacheSlugCounters(BaseSlugCounters):
+    """
+    Keeps the indexes in the given Django cache, so they are shared between
+    processes.
+    """
+
+    def __init__(self, alias='default', timeout=None,
+                 key_prefix='aldryn_translation_tools:slug_counter'):
+        self.alias = alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    def get_key(self, model, scope, slug):
+        digest = hashlib.md5(force_bytes(
+            '{0}:{1}'.format(scope, slug))).hexdigest()
+        return '{0}:{1}:{2}'.format(
+            self.key_prefix, model._meta.label_lower, digest)
+
+    def get_next_index(self, model, scope, slug):
+        return caches[self.alias].get(self.get_key(model, scope, slug))
+
+    def set_next_index(self, model, scope, slug, index):
+        cache = caches[self.alias]
+        key = self.get_key(model, scope, slug)
+        current = cache.get(key)
+        if current is None or current < index:
+            cache.set(key, index, self.timeout)
+
+
+class DatabaseSlugCounters(BaseSlugCounters):
+    """
+    Keeps the indexes in the SlugCounter table, which needs
+    `aldryn_translation_tools` in INSTALLED_APPS.
+    """
+
+    def get_lookup(self, model, scope, slug):
+        from django.contrib.contenttypes.models import ContentType
+        return {
+            'content_type': ContentType.objects.get_for_model(model),
+            'scope': scope,
+            'slug': slug,
+        }
+
+    def get_queryset(self, model, scope, slug):
+        from .registry import SlugCounter
+        return SlugCounter.objects.filter(
+            **self.get_lookup(model, scope, slug))
+
+    def get_next_index(self, model, scope, slug):
+        return self.get_queryset(model, scope, slug).values_list(
+            'next_index', flat=True).first()
+
+    def set_next_index(self, model, scope, slug, index):
+        qs = self.get_queryset(model, scope, slug)
+        if qs.filter(next_index__lt=index).update(next_index=index):
+            return
+        try:
+            with transaction.atomic():
+                qs.model.objects.create(
+                    next_index=index, **self.get_lookup(model, scope, slug))
+        except IntegrityError:
+            # The counter exists already, or was just created concurrently.
+            qs.filter(next_index__lt=index).update(next_index=index)
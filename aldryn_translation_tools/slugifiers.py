@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import re
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import six
+from django.utils.encoding import force_text
+from django.utils.module_loading import import_string
+
+from slugify import slugify as python_slugify, smart_truncate
+
+from .utils import LRUCache
+
+
+DISALLOWED_CHARS_PATTERN = re.compile(r'[^a-z0-9]+')
+NUMBERS_PATTERN = re.compile(r'(?<=\d),(?=\d)')
+
+# The slugifier in use, see get_slugifier().
+_slugifiers = {}
+
+
+@receiver(setting_changed)
+def clear_slugifier(**kwargs):
+    if kwargs['setting'] in ('ALDRYN_TRANSLATION_TOOLS_SLUGIFIER',
+                             'ALDRYN_TRANSLATION_TOOLS_SLUGIFY_CACHE_SIZE'):
+        _slugifiers.clear()
+
+
+def ascii_slugify(text, max_length=0, word_boundary=False, save_order=False,
+                  separator='-'):
+    """
+    Return the same slug as python-slugify, faster for ASCII text without
+    HTML entities, which needs neither transliteration nor normalization.
+    Other text is passed on to python-slugify.
+    """
+    text = force_text(text)
+    try:
+        text.encode('ascii')
+    except UnicodeError:
+        ascii_text = False
+    else:
+        ascii_text = '&' not in text
+    if not ascii_text:
+        return python_slugify(
+            text, max_length=max_length, word_boundary=word_boundary,
+            save_order=save_order, separator=separator)
+
+    text = text.lower()
+    if ',' in text:
+        text = NUMBERS_PATTERN.sub('', text)
+    text = DISALLOWED_CHARS_PATTERN.sub('-', text).strip('-')
+    if max_length > 0:
+        text = smart_truncate(text, max_length, word_boundary, '-', save_order)
+    if separator != '-':
+        text = text.replace('-', separator)
+    return text
+
+
+def cache_slugifier(slugifier, max_size):
+    """
+    Wrap the slugifier with a cache of the slugs of the `max_size` most
+    recently slugified texts and options.
+    """
+    cache = LRUCache(max_size)
+
+    def slugify(text, max_length=0, word_boundary=False, save_order=False,
+                separator='-'):
+        key = (text, max_length, word_boundary, save_order, separator)
+        slug = cache.get(key)
+        if slug is None:
+            slug = slugifier(
+                text, max_length=max_length, word_boundary=word_boundary,
+                save_order=save_order, separator=separator)
+            cache.set(key, slug)
+        return slug
+
+    slugify.cache = cache
+    return slugify
+
+
+def get_slugifier():
+    """
+    Return the slugifier set in `settings.ALDRYN_TRANSLATION_TOOLS_SLUGIFIER`
+    (a callable or its dotted path, default: python-slugify's slugify), with
+    a cache of `settings.ALDRYN_TRANSLATION_TOOLS_SLUGIFY_CACHE_SIZE` slugs
+    (default: 10000, 0 disables it).
+    """
+    try:
+        return _slugifiers['slugify']
+    except KeyError:
+        pass
+    slugifier = getattr(
+        settings, 'ALDRYN_TRANSLATION_TOOLS_SLUGIFIER', python_slugify)
+    if isinstance(slugifier, six.string_types):
+        slugifier = import_string(slugifier)
+    max_size = getattr(
+        settings, 'ALDRYN_TRANSLATION_TOOLS_SLUGIFY_CACHE_SIZE', 10000)
+    if max_size:
+        slugifier = cache_slugifier(slugifier, max_size)
+    _slugifiers['slugify'] = slugifier
+    return slugifier
+
+
+def slugify_many(items, slugifier=None):
+    """
+    Return the slugs of the (text, max_length, word_boundary, save_order,
+    separator) items, made with `slugifier` (a callable or its dotted path,
+    default: get_slugifier()). The regenerate_slugs management command runs
+    it in worker processes.
+    """
+    if slugifier is None:
+        slugifier = get_slugifier()
+    elif isinstance(slugifier, six.string_types):
+        slugifier = import_string(slugifier)
+    return [
+        slugifier(text, max_length=max_length, word_boundary=word_boundary,
+                  save_order=save_order, separator=separator)
+        for text, max_length, word_boundary, save_order, separator in items
+    ]
@@ -2,11 +2,26 @@
 
 from __future__ import unicode_literals
 
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.encoding import force_bytes, force_text
 from django.utils.translation import get_language_from_request
 
+from cms.utils.i18n import get_fallback_languages
 from cms.utils.urlutils import admin_reverse
 
-from parler.models import TranslatableModel
+from parler.models import TranslatableModel, TranslatedFieldsModel
 
 
 try:
@@ -15,6 +30,94 @@ except ImportError:  # pragma: no cover
     from urllib.parse import urlencode
 
 
+class LRUCache(object):
+    """
+    A thread-safe mapping holding at most `max_size` items, which evicts the
+    least recently used items first.
+    """
+
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._items.pop(key)
+            except KeyError:
+                return default
+            self._items[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class FallbackChain(namedtuple('FallbackChain', ['languages', 'ranks'])):
+    """
+    A language followed by its fallback languages, in order of preference,
+    with a dict mapping each of them to its position in the chain.
+    """
+
+    __slots__ = ()
+
+    def first_available(self, available_languages):
+        """
+        Return the most preferred language of the chain that is in
+        `available_languages`, or None.
+        """
+        ranks = self.ranks
+        available = [ranks[language] for language in available_languages
+                     if language in ranks]
+        if available:
+            return self.languages[min(available)]
+        return None
+
+
+# Cache of the fallback chains, keyed by (language_code, site_id).
+_fallback_chains = {}
+
+
+@receiver(setting_changed)
+def clear_fallback_chains(**kwargs):
+    if kwargs['setting'] in ('CMS_LANGUAGES', 'LANGUAGES', 'SITE_ID'):
+        _fallback_chains.clear()
+
+
+def get_fallback_chain(language_code, site_id=None):
+    """
+    Return the FallbackChain of the given language, as defined in
+    `settings.CMS_LANGUAGES` for the given site (defaults to the current
+    SITE_ID). The chains are computed once and cached.
+    """
+    if site_id is None:
+        site_id = getattr(settings, 'SITE_ID', None)
+    key = (language_code, site_id)
+    try:
+        return _fallback_chains[key]
+    except KeyError:
+        pass
+    languages = [language_code] + get_fallback_languages(
+        language_code, site_id=site_id)
+    ranks = {}
+    for rank, language in enumerate(languages):
+        ranks.setdefault(language, rank)
+    chain = _fallback_chains[key] = FallbackChain(tuple(languages), ranks)
+    return chain
+
+
 def get_admin_url(action, action_args=[], **url_args):
     """
     Convenience method for constructing admin-urls with GET parameters.
@@ -39,6 +142,276 @@ def get_admin_url(action, action_args=[], **url_args):
         return base_url
 
 
+# os.rename() does not replace existing files on Windows.
+replace = getattr(os, 'replace', os.rename)
+
+
+def write_atomic(path, pieces, compress=False):
+    """
+    Write the text pieces to `path` through a temporary file in the same
+    directory, which then replaces `path` at once, so that readers never see
+    a partially written file.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            if compress:
+                out = gzip.GzipFile(
+                    filename='', mode='wb', fileobj=tmp, mtime=0)
+            else:
+                out = tmp
+            for piece in pieces:
+                out.write(piece.encode('utf-8'))
+            if compress:
+                out.close()
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        # mkstemp() creates files only readable by their owner.
+        os.chmod(tmp_path, 0o644)
+        replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+# Sentinel for values missing from the object cache, as None is cached too.
+_MISSING = object()
+
+# Per-process generation of each model in the object cache. Bumping it
+# invalidates the objects memoized on requests.
+_object_generations = {}
+
+
+def invalidate_object_cache(model):
+    """
+    Invalidate all the cached objects of the model, whichever object or
+    translation changed, as it may change the result of any lookup. Saving or
+    deleting objects does it, call it after changing objects without
+    signals, e.g. with `QuerySet.update()`.
+    """
+    _object_generations[model] = _object_generations.get(model, 0) + 1
+    cache = _get_object_cache()
+    if cache is not None:
+        key = _get_object_version_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _get_initial_object_version(), None)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_changed_objects(sender, **kwargs):
+    """
+    Invalidate the cached objects of the model of any saved or deleted object
+    or translation. The receivers are connected in every process using this
+    module, so that the processes changing objects, e.g. the admin or
+    management commands, invalidate the objects cached by the others even if
+    they never resolve objects themselves.
+    """
+    if not getattr(settings, 'ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE', False):
+        return
+    if issubclass(sender, TranslatedFieldsModel):
+        sender = sender._meta.get_field('master').related_model
+    invalidate_object_cache(sender)
+
+
+def _get_object_cache():
+    alias = getattr(
+        settings, 'ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE_ALIAS', 'default')
+    if alias is None:
+        return None
+    return caches[alias]
+
+
+def _get_object_version_key(model):
+    return 'aldryn_translation_tools:object_version:{0}'.format(
+        model._meta.label_lower)
+
+
+def _get_initial_object_version():
+    # If the version gets evicted from the cache, starting over from a
+    # timestamp makes sure the objects cached before are not used again.
+    return int(time.time() * 1000)
+
+
+def _get_object_cache_key(cache, model, *parts):
+    version_key = _get_object_version_key(model)
+    version = cache.get(version_key)
+    if version is None:
+        version = _get_initial_object_version()
+        if not cache.add(version_key, version, None):
+            version = cache.get(version_key, version)
+    digest = hashlib.md5(
+        force_bytes(repr([force_text(part) for part in parts]))).hexdigest()
+    return 'aldryn_translation_tools:object:{0}:{1}:{2}'.format(
+        model._meta.label_lower, version, digest)
+
+
+class ObjectResolver(object):
+    """
+    Resolves objects of a model from the URL kwargs of requests. The
+    introspection of the model is done once, when the resolver is created, so
+    use `get_object_resolver()` to get a shared instance.
+    """
+
+    def __init__(self, model, pk_url_kwarg='pk', slug_url_kwarg='slug',
+                 slug_field='slug'):
+        self.model = model
+        self.pk_url_kwarg = pk_url_kwarg
+        self.slug_url_kwarg = slug_url_kwarg
+        self.slug_field = slug_field
+        # If the model is translatable, and the given slug is a translated
+        # field, then find it the Parler way.
+        try:
+            translated_fields = model._parler_meta.get_translated_fields()
+        except AttributeError:
+            translated_fields = []
+        self.slug_translated = False
+        if issubclass(model, TranslatableModel):
+            self.slug_translated = slug_url_kwarg in translated_fields
+        # Former slugs are looked up in the slug history, see
+        # TranslatedAutoSlugifyMixin.slug_keep_history.
+        self.slug_history = False
+        if self.slug_translated and getattr(model, 'slug_keep_history', False):
+            self.slug_history = slug_field == model.slug_field_name
+
+    def get_lookup(self, kwargs):
+        """
+        Return the (field, value, translated) lookup of the object designated
+        by the URL kwargs, or None.
+        """
+        if self.pk_url_kwarg in kwargs:
+            return ('pk', kwargs[self.pk_url_kwarg], False)
+        elif self.slug_url_kwarg in kwargs:
+            return (self.slug_field, kwargs[self.slug_url_kwarg],
+                    self.slug_translated)
+        return None
+
+    def fetch(self, language, lookup):
+        """
+        Return the first object matching the lookup, or None.
+        """
+        field, value, translated = lookup
+        if not translated:
+            return self.model.objects.filter(**{field: value}).first()
+        obj = self.model.objects.active_translations(
+            language, **{field: value}).first()
+        if obj is None and field == self.slug_field and self.slug_history:
+            obj = self.fetch_from_history(language, value)
+        return obj
+
+    def fetch_from_history(self, language, slug):
+        """
+        Return the object whose former slug in the given language is `slug`,
+        or None.
+        """
+        from django.contrib.contenttypes.models import ContentType
+        from .registry import SlugHistory
+        scope = '' if self.model.slug_globally_unique else language
+        object_ids = SlugHistory.objects.filter(
+            content_type=ContentType.objects.get_for_model(self.model),
+            scope=scope,
+            slug=slug,
+        ).values('object_id')
+        return self.model.objects.active_translations(language).filter(
+            pk__in=object_ids).first()
+
+    def resolve(self, request):
+        """
+        Return the object designated by the request, or None, using the
+        object cache if it is enabled.
+        """
+        lookup = self.get_lookup(request.resolver_match.kwargs)
+        if lookup is None:
+            return None
+        language = get_language_from_request(request, check_path=True)
+        return self.resolve_lookup(request, language, lookup)
+
+    def aresolve(self, request):
+        """
+        Async counterpart of resolve(), returning an awaitable of the object.
+        The objects memoized on the request are returned without leaving the
+        event loop, the other lookups are run in a database thread, see
+        `async_utils.run_in_database_thread()`. Needs Python 3.
+        """
+        from .async_utils import completed, run_in_database_thread
+        lookup = self.get_lookup(request.resolver_match.kwargs)
+        if lookup is None:
+            return completed(None)
+        language = get_language_from_request(request, check_path=True)
+        obj = self.get_memoized(request, language, lookup)
+        if obj is not _MISSING:
+            return completed(obj)
+        return run_in_database_thread(
+            self.resolve_lookup, request, language, lookup)
+
+    def _get_memo_key(self, language, lookup):
+        model = self.model
+        return (model, _object_generations.get(model, 0), language, lookup)
+
+    def get_memoized(self, request, language, lookup):
+        """
+        Return the object memoized on the request for the lookup, or _MISSING
+        if there is none or the object cache is disabled.
+        """
+        if not getattr(settings, 'ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE', False):
+            return _MISSING
+        memo = request.__dict__.get('_aldryn_translation_tools_objects', {})
+        return memo.get(self._get_memo_key(language, lookup), _MISSING)
+
+    def resolve_lookup(self, request, language, lookup):
+        """
+        Return the first object matching the lookup in the given language, or
+        None, using the object cache if it is enabled.
+        """
+        if not getattr(settings, 'ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE', False):
+            return self.fetch(language, lookup)
+
+        model = self.model
+        memo = request.__dict__.setdefault(
+            '_aldryn_translation_tools_objects', {})
+        memo_key = self._get_memo_key(language, lookup)
+        obj = memo.get(memo_key, _MISSING)
+        if obj is not _MISSING:
+            return obj
+
+        cache = _get_object_cache()
+        if cache is None:
+            obj = self.fetch(language, lookup)
+        else:
+            key = _get_object_cache_key(cache, model, language, *lookup)
+            obj = cache.get(key, _MISSING)
+            if obj is _MISSING:
+                obj = self.fetch(language, lookup)
+                cache.set(key, obj, getattr(
+                    settings, 'ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE_TIMEOUT',
+                    300))
+        memo[memo_key] = obj
+        return obj
+
+
+# Cache of the object resolvers, keyed by their arguments.
+_object_resolvers = {}
+
+
+def get_object_resolver(model, pk_url_kwarg='pk', slug_url_kwarg='slug',
+                        slug_field='slug'):
+    """
+    Return the ObjectResolver for the given model and URL kwargs, creating it
+    on first use.
+    """
+    key = (model, pk_url_kwarg, slug_url_kwarg, slug_field)
+    try:
+        return _object_resolvers[key]
+    except KeyError:
+        pass
+    resolver = _object_resolvers[key] = ObjectResolver(
+        model, pk_url_kwarg, slug_url_kwarg, slug_field)
+    return resolver
+
+
 def get_object_from_request(model, request,
                             pk_url_kwarg='pk',
                             slug_url_kwarg='slug',
@@ -49,24 +422,27 @@ def get_object_from_request(model, request,
 
     Note that no checking is done that the obj's kwargs really are for objects
     matching the provided model (how would it?) so use only where appropriate.
+
+    If `settings.ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE` is True, the objects
+    are memoized on the request, and cached in the cache
+    `settings.ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE_ALIAS` (default:
+    'default', None disables it) for
+    `settings.ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE_TIMEOUT` seconds (default:
+    300). Saving or deleting any object or translation of the model
+    invalidates its cached objects.
     """
-    language = get_language_from_request(request, check_path=True)
-    kwargs = request.resolver_match.kwargs
-    mgr = model.objects
-    if pk_url_kwarg in kwargs:
-        return mgr.filter(pk=kwargs[pk_url_kwarg]).first()
-    elif slug_url_kwarg in kwargs:
-        # If the model is translatable, and the given slug is a translated
-        # field, then find it the Parler way.
-        filter_kwargs = {slug_field: kwargs[slug_url_kwarg]}
-        try:
-            translated_fields = model._parler_meta.get_translated_fields()
-        except AttributeError:
-            translated_fields = []
-        if issubclass(model, TranslatableModel) and slug_url_kwarg in translated_fields:
-            return mgr.active_translations(language, **filter_kwargs).first()
-        else:
-            # OK, do it the normal way.
-            return mgr.filter(**filter_kwargs).first()
-    else:
-        return None
+    return get_object_resolver(
+        model, pk_url_kwarg, slug_url_kwarg, slug_field).resolve(request)
+
+
+def aget_object_from_request(model, request,
+                             pk_url_kwarg='pk',
+                             slug_url_kwarg='slug',
+                             slug_field='slug'):
+    """
+    Async counterpart of get_object_from_request(), for async views, which
+    returns an awaitable of the object or None. See
+    `ObjectResolver.aresolve()`. Needs Python 3.
+    """
+    return get_object_resolver(
+        model, pk_url_kwarg, slug_url_kwarg, slug_field).aresolve(request)
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from django.contrib import admin
+
+from parler.admin import TranslatableAdmin
+
+from aldryn_translation_tools.admin import AllTranslationsMixin
+
+from .models import Simple
+
+
+@admin.register(Simple)
+class SimpleAdmin(AllTranslationsMixin, TranslatableAdmin):
+    list_display = ('__str__', )
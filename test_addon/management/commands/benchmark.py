@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import platform
+import sys
+import timeit
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches
+from django.utils.translation import override
+
+from cms import api
+from cms.appresolver import clear_app_resolvers
+from cms.utils.conf import get_cms_setting
+from cms.utils.urlutils import admin_reverse
+
+from aldryn_translation_tools.sitemaps import I18NSitemap
+from aldryn_translation_tools.slug_counters import LRUSlugCounters
+from aldryn_translation_tools.slugifiers import get_slugifier
+
+from ...admin import SimpleAdmin
+from ...models import Complex, Simple, Unconventional
+
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+
+BENCHMARKS = ['slug_meta', 'make_new_slug', 'known_translation_getter',
+              'sitemap', 'admin']
+
+DUPLICATE_TITLE = 'Duplicate title'
+
+# The models seeded with duplicate titles, with their untranslated and
+# translated fields.
+DUPLICATES = [
+    (Simple, {}, {'name': DUPLICATE_TITLE}),
+    (Unconventional, {}, {'title': DUPLICATE_TITLE}),
+    (Complex, {'object_type': 'benchmark'}, {'name': DUPLICATE_TITLE}),
+]
+
+
+class SimpleSitemap(I18NSitemap):
+    prefetch_related = ('translations', )
+
+    def items(self):
+        return Simple.objects.translated(self.language).order_by('pk')
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the helpers of aldryn_translation_tools against a dataset '
+        'of test_addon models, reporting the time, queries and memory of '
+        'each operation. Run it with: python test_settings.py benchmark'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'benchmarks', nargs='*', metavar='benchmark',
+            help='Benchmarks to run (default: all), among: {0}.'.format(
+                ', '.join(BENCHMARKS)))
+        parser.add_argument(
+            '--objects', type=int, default=10000,
+            help='Number of Simple objects to create (default: 10000).')
+        parser.add_argument(
+            '--languages', type=int, default=None,
+            help='Number of languages of settings.LANGUAGES to translate the '
+                 'objects into (default: all). Object n is translated into '
+                 'the first 1 + n % languages of them.')
+        parser.add_argument(
+            '--duplicates', type=int, default=100,
+            help='Number of Simple, Unconventional and Complex objects '
+                 'sharing the same title (default: 100).')
+        parser.add_argument(
+            '--page-size', type=int, default=100,
+            help='Number of objects per page, as in a changelist '
+                 '(default: 100).')
+        parser.add_argument(
+            '--iterations', type=int, default=100,
+            help='Number of times the cheap operations are repeated per '
+                 'measure (default: 100).')
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Number of measures of each operation, of which the best '
+                 'is reported (default: 3).')
+        parser.add_argument(
+            '--json', default=None, metavar='PATH',
+            help='Write the results as JSON to this file, or "-" for the '
+                 'standard output.')
+        parser.add_argument(
+            '--compare', default=None, metavar='PATH',
+            help='Compare the results with those of a previous run, as '
+                 'written by --json.')
+
+    def handle(self, *args, **options):
+        benchmarks = options['benchmarks'] or BENCHMARKS
+        unknown = set(benchmarks) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError('Unknown benchmarks: {0}'.format(
+                ', '.join(sorted(unknown))))
+        languages = [code for code, name in settings.LANGUAGES]
+        if options['languages']:
+            languages = languages[:options['languages']]
+        self.options = options
+        self.languages = languages
+        self.quiet = options['json'] == '-'
+        self.results = []
+
+        call_command(
+            'migrate', run_syncdb=True, interactive=False, verbosity=0)
+        with override(languages[0]):
+            self.seed(options['objects'], options['duplicates'])
+            for name in BENCHMARKS:
+                if name in benchmarks:
+                    getattr(self, 'benchmark_{0}'.format(name))()
+
+        output = {
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'parameters': {
+                'objects': options['objects'],
+                'languages': languages,
+                'duplicates': options['duplicates'],
+                'page_size': options['page_size'],
+                'iterations': options['iterations'],
+                'repeat': options['repeat'],
+            },
+            'results': self.results,
+        }
+        if options['json'] == '-':
+            json.dump(output, sys.stdout, indent=2, sort_keys=True)
+        elif options['json']:
+            with open(options['json'], 'w') as output_file:
+                json.dump(output, output_file, indent=2, sort_keys=True)
+        if options['compare']:
+            self.compare(options['compare'])
+
+    def seed(self, objects, duplicates):
+        """
+        Creates the objects with bulk inserts, so that seeding large datasets
+        does not dominate the run.
+        """
+        translations = []
+        for index, pk in enumerate(self.create_roots(Simple, objects)):
+            # Leave some languages untranslated, for the fallbacks.
+            for language in self.languages[:1 + index % len(self.languages)]:
+                name = 'Simple {0} {1}'.format(index, language)
+                translations.append(Simple._parler_meta.root_model(
+                    master_id=pk, language_code=language, name=name,
+                    slug=get_slugifier()(name)))
+        Simple._parler_meta.root_model.objects.bulk_create(
+            translations, batch_size=500)
+
+        for model, fields, translated_fields in DUPLICATES:
+            obj = self.get_duplicate(model, fields, translated_fields)
+            slugs = islice(
+                obj._get_candidate_slugs(obj._get_ideal_slug()), duplicates)
+            pks = self.create_roots(model, duplicates, **fields)
+            translations = []
+            for pk, slug in zip(pks, slugs):
+                values = dict(translated_fields)
+                values[model.slug_field_name] = slug
+                translations.append(model._parler_meta.root_model(
+                    master_id=pk, language_code=self.languages[0], **values))
+            model._parler_meta.root_model.objects.bulk_create(
+                translations, batch_size=500)
+        self.log('Seeded {0} objects in {1} languages, and {2} duplicates '
+                 'of {3} models'.format(objects, len(self.languages),
+                                        duplicates, len(DUPLICATES)))
+
+    def create_roots(self, model, count, **fields):
+        """
+        Inserts `count` objects of the model, and returns their pks.
+        """
+        latest = model.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        model.objects.bulk_create(
+            [model(**fields) for _ in range(count)], batch_size=500)
+        return list(model.objects.filter(pk__gt=latest).order_by(
+            'pk').values_list('pk', flat=True))
+
+    def get_duplicate(self, model, fields, translated_fields):
+        obj = model(**fields)
+        obj.set_current_language(self.languages[0])
+        for name, value in translated_fields.items():
+            setattr(obj, name, value)
+        return obj
+
+    def get_page(self, prefetch=True):
+        qs = Simple.objects.order_by('pk')
+        if prefetch:
+            qs = qs.prefetch_related('translations')
+        return list(qs[:self.options['page_size']])
+
+    def setup_apphook(self):
+        """
+        Creates a CMS page with the apphook of the Simple objects, so that
+        their URLs can be reversed.
+        """
+        page = api.create_page(
+            'Simple Page', get_cms_setting('TEMPLATES')[0][0],
+            self.languages[0], published=True, apphook='SimpleApp',
+            apphook_namespace='simple')
+        for language in self.languages[1:]:
+            api.create_title(language, page.get_slug(), page)
+            page.publish(language)
+        clear_app_resolvers()
+        clear_url_caches()
+
+    def measure(self, name, func, number=None, **info):
+        """
+        Runs `func` `number` times per measure (by default: --iterations),
+        and records the best time per call, along with the queries and the
+        peak memory allocated by a single call.
+        """
+        if number is None:
+            number = self.options['iterations']
+        func()  # Warm up the caches.
+        timings = timeit.repeat(
+            func, number=number, repeat=self.options['repeat'])
+        peak = None
+        # The query log is bounded, and may be full with DEBUG = True.
+        reset_queries()
+        if tracemalloc is not None:
+            tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                func()
+            if tracemalloc is not None:
+                peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if tracemalloc is not None:
+                tracemalloc.stop()
+        result = {
+            'name': name,
+            'number': number,
+            'usec_per_call': min(timings) * 1000000 / number,
+            'queries_per_call': len(queries),
+            'peak_memory_bytes': peak,
+        }
+        result.update(info)
+        self.results.append(result)
+        self.log('{name}: {usec:.2f} usec, {queries} queries{memory} per '
+                 'call'.format(
+                     name=name, usec=result['usec_per_call'],
+                     queries=result['queries_per_call'],
+                     memory='' if peak is None else ', {0:.1f} KiB'.format(
+                         peak / 1024.0)))
+        return result
+
+    def log(self, message):
+        if not self.quiet:
+            self.stdout.write(message)
+
+    def compare(self, path):
+        """
+        Reports the changes of time and queries since the results in `path`.
+        """
+        with open(path) as baseline_file:
+            baseline = dict(
+                (result['name'], result)
+                for result in json.load(baseline_file)['results'])
+        for result in self.results:
+            previous = baseline.get(result['name'])
+            if previous is None:
+                continue
+            change = (result['usec_per_call'] / previous['usec_per_call'] - 1
+                      if previous['usec_per_call'] else 0)
+            self.stderr.write(
+                '{name}: {change:+.1%} time, queries {before} -> {after}'
+                ''.format(name=result['name'], change=change,
+                          before=previous['queries_per_call'],
+                          after=result['queries_per_call']))
+
+    def benchmark_slug_meta(self):
+        """
+        Slug generation cost (without queries) with and without the cache of
+        the introspected slug metadata.
+        """
+        for model in [Simple, Unconventional]:
+            obj = model()
+            obj.set_current_language(self.languages[0])
+
+            def generate():
+                obj.get_slug_max_length(2)
+                obj.get_slug_default()
+                obj._get_slug_filter()
+                obj._get_ideal_slug()
+
+            def generate_uncached():
+                model._slug_meta_cache.clear()
+                generate()
+
+            name = '{0}.slug_meta'.format(model.__name__)
+            self.measure(name + ' (cached)', generate)
+            self.measure(name + ' (uncached)', generate_uncached)
+
+    def benchmark_make_new_slug(self):
+        """
+        Finding a free slug for an object whose title is used by
+        --duplicates objects already, by checking each candidate (the
+        default), by prefetching the collisions, and with slug counters.
+        """
+        for model, fields, translated_fields in DUPLICATES:
+            name = '{0}.make_new_slug'.format(model.__name__)
+            obj = self.get_duplicate(model, fields, translated_fields)
+            obj.slug_prefetch_collisions = False
+            self.measure(name + ' (scan)', obj.make_new_slug, number=1)
+
+            obj.slug_prefetch_collisions = True
+            self.measure(name + ' (prefetch)', obj.make_new_slug)
+
+            obj.slug_counters = LRUSlugCounters()
+            self.measure(name + ' (counters)', obj.make_new_slug)
+
+    def benchmark_known_translation_getter(self):
+        """
+        Getting a translated field of a page of objects in the last
+        language, from which most objects fall back.
+        """
+        language = self.languages[-1]
+        page = self.get_page()
+
+        def getter():
+            for obj in page:
+                obj.known_translation_getter('name', language_code=language)
+
+        def getter_unprefetched():
+            for obj in self.get_page(prefetch=False):
+                obj.known_translation_getter('name', language_code=language)
+
+        def bulk_getter():
+            Simple.bulk_known_translation_getter(
+                self.get_page(prefetch=False), 'name', language_code=language)
+
+        self.measure('Simple.known_translation_getter (prefetched)', getter)
+        self.measure('Simple.known_translation_getter (queries)',
+                     getter_unprefetched, number=1)
+        self.measure('Simple.bulk_known_translation_getter', bulk_getter)
+
+    def benchmark_sitemap(self):
+        """
+        The locations of a page of objects, and a whole sitemap, in each
+        language.
+        """
+        self.setup_apphook()
+        site = Site.objects.get_current()
+        page = self.get_page()
+        for language in self.languages:
+            sitemap = SimpleSitemap(language)
+
+            def location():
+                for obj in page:
+                    sitemap.location(obj)
+
+            self.measure('I18NSitemap.location ({0})'.format(language),
+                         location)
+            self.measure(
+                'I18NSitemap.get_urls ({0})'.format(language),
+                lambda: sitemap.get_urls(site=site), number=1,
+                items=sitemap.paginator.count)
+
+    def benchmark_admin(self):
+        """
+        The links to the translations of a page of objects, one object at a
+        time and prepared for the whole page, and the whole changelist.
+        """
+        model_admin = SimpleAdmin(Simple, admin.site)
+        page = self.get_page(prefetch=False)
+
+        def per_object():
+            for obj in page:
+                obj._all_translations = None
+                model_admin.all_translations(obj)
+
+        def prepared():
+            model_admin.prepare_all_translations(page)
+            for obj in page:
+                model_admin.all_translations(obj)
+
+        self.measure('AllTranslationsMixin.all_translations (per object)',
+                     per_object)
+        self.measure('AllTranslationsMixin.all_translations (prepared)',
+                     prepared)
+
+        user = User(username='benchmark', is_staff=True, is_superuser=True)
+        user.save()
+        request = RequestFactory().get(
+            admin_reverse('test_addon_simple_changelist'))
+        request.user = user
+        request.session = {}
+
+        def changelist():
+            model_admin.changelist_view(request).render()
+
+        self.measure('SimpleAdmin.changelist_view', changelist, number=1)
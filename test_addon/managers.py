@@ -2,14 +2,18 @@
 
 from __future__ import unicode_literals
 
-from parler.managers import TranslatableManager, TranslatableQuerySet
+from parler.managers import TranslatableQuerySet
 
+from aldryn_translation_tools.managers import (
+    TranslationHelperManager, TranslationHelperQuerySetMixin,
+)
 
-class SimpleQuerySet(TranslatableQuerySet):
+
+class SimpleQuerySet(TranslationHelperQuerySetMixin, TranslatableQuerySet):
     pass
 
 
-class SimpleManager(TranslatableManager):
+class SimpleManager(TranslationHelperManager):
     queryset_class = SimpleQuerySet
 
     def get_queryset(self):
@@ -2,6 +2,8 @@
 
 from __future__ import unicode_literals
 
+import uuid
+
 from django.db import models
 from django.urls import reverse
 from django.utils.encoding import python_2_unicode_compatible
@@ -91,3 +93,50 @@ class Complex(TranslatedAutoSlugifyMixin, TranslatableModel):
 
     def __str__(self):
         return self.get_slug_source()
+
+
+@python_2_unicode_compatible
+class Reserved(TranslatedAutoSlugifyMixin, TranslatableModel):
+    slug_source_field_name = 'name'
+    slug_use_registry = True
+
+    translations = TranslatedFields(
+        name=models.CharField(max_length=64),
+        slug=models.SlugField(max_length=64, blank=True, default='')
+    )
+
+    def __str__(self):
+        return self.safe_translation_getter(
+            'name', default="Reserved: {0}".format(self.pk))
+
+
+@python_2_unicode_compatible
+class ReservedUUID(TranslatedAutoSlugifyMixin, TranslatableModel):
+    slug_source_field_name = 'name'
+    slug_use_registry = True
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+
+    translations = TranslatedFields(
+        name=models.CharField(max_length=64),
+        slug=models.SlugField(max_length=64, blank=True, default='')
+    )
+
+    def __str__(self):
+        return self.safe_translation_getter(
+            'name', default="ReservedUUID: {0}".format(self.pk))
+
+
+@python_2_unicode_compatible
+class Historic(TranslatedAutoSlugifyMixin, TranslatableModel):
+    slug_source_field_name = 'name'
+    slug_keep_history = True
+
+    translations = TranslatedFields(
+        name=models.CharField(max_length=64),
+        slug=models.SlugField(max_length=64, blank=True, default='')
+    )
+
+    def __str__(self):
+        return self.safe_translation_getter(
+            'name', default="Historic: {0}".format(self.pk))
@@ -4,14 +4,17 @@ from __future__ import unicode_literals
 
 import random
 import string
+import sys
 
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser, User
 from django.contrib.sites.models import Site
 from django.test import RequestFactory, TransactionTestCase
+from django.urls import clear_url_caches
 from django.utils.translation import override
 
 from cms import api
+from cms.appresolver import clear_app_resolvers
 from cms.models import Title
 from cms.utils.conf import get_cms_setting
 from cms.utils.i18n import get_language_list
@@ -139,6 +142,20 @@ class CMSRequestBasedTest(TestUtilityMixin, TransactionTestCase):
                 api.create_title(language, page.get_slug(), page)
                 page.publish(language)
 
+    def reload_urls(self):
+        url_modules = [
+            'cms.urls',
+            'test_addon.urls',
+            settings.ROOT_URLCONF,
+        ]
+
+        clear_app_resolvers()
+        clear_url_caches()
+
+        for module in url_modules:
+            if module in sys.modules:
+                del sys.modules[module]
+
     @classmethod
     def get_request(cls, language=None, url="/"):
         """
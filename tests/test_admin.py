@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from django.contrib import admin
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import override
+
+from cms.utils.urlutils import admin_reverse
+
+from djangocms_helper.utils import create_user
+from test_addon.admin import SimpleAdmin
+from test_addon.models import Simple
+
+from . import SimpleTransactionTestCase
+
+
+class TestAllTranslationsMixin(SimpleTransactionTestCase):
+
+    def setUp(self):
+        super(TestAllTranslationsMixin, self).setUp()
+        self.reload_urls()
+        self.model_admin = SimpleAdmin(Simple, admin.site)
+
+    def test_all_translations(self):
+        simple = Simple.objects.create(name='english only')
+        with override('en'):
+            links = self.model_admin.all_translations(simple)
+        url = admin_reverse('test_addon_simple_change', args=(simple.pk, ))
+        self.assertIn(
+            '<a class="lang-code current active" href="{0}?language=en" '
+            'title="English (translated)">en</a>'.format(url), links)
+        self.assertIn(
+            '<a class="lang-code" href="{0}?language=de" '
+            'title="German (untranslated)">de</a>'.format(url), links)
+
+    def test_prepare_all_translations(self):
+        objects = list(Simple.objects.order_by('pk'))
+        expected = [self.model_admin.all_translations(obj)
+                    for obj in Simple.objects.order_by('pk')]
+        with self.assertNumQueries(1):
+            self.model_admin.prepare_all_translations(objects)
+            self.assertEqual(
+                expected,
+                [self.model_admin.all_translations(obj) for obj in objects])
+
+    def test_changelist(self):
+        for index in range(10):
+            Simple.objects.create(name='simple {0}'.format(index))
+        user = create_user('admin', 'admin@example.com', 'admin',
+                           is_staff=True, is_superuser=True)
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                admin_reverse('test_addon_simple_changelist'))
+        self.assertEqual(response.status_code, 200)
+        translation_queries = [
+            query for query in queries.captured_queries
+            if 'test_addon_simple_translation' in query['sql']]
+        # The names of the objects and their languages.
+        self.assertLessEqual(len(translation_queries), 1 + Simple.objects.count())
+        # The languages are annotated on the page of objects.
+        languages_queries = [
+            query for query in translation_queries
+            if '"language_code" FROM' in query['sql']]
+        self.assertEqual(len(languages_queries), 0)
+        mask_queries = [
+            query for query in translation_queries
+            if '"all_translations_mask"' in query['sql']]
+        self.assertEqual(len(mask_queries), 1)
+        self.assertContains(
+            response, admin_reverse('test_addon_simple_change',
+                                    args=(self.simple1.pk, )) + '?language=fr')
+
+    def test_annotate_all_translations(self):
+        Simple.objects.create(name='english only')
+        expected = [self.model_admin.all_translations(obj)
+                    for obj in Simple.objects.order_by('pk')]
+        with self.assertNumQueries(1):
+            objects = list(self.model_admin.annotate_all_translations(
+                Simple.objects.order_by('pk')))
+            self.model_admin.prepare_all_translations(objects)
+            self.assertEqual(
+                expected,
+                [self.model_admin.all_translations(obj) for obj in objects])
+        # en, de and fr, then en only.
+        self.assertEqual([7, 7, 1], [obj.all_translations_mask
+                                     for obj in objects])
+        self.assertEqual(['en', 'de', 'fr'],
+                         self.model_admin.get_languages_from_mask(7))
+
+    def test_language_list_filters(self):
+        english = Simple.objects.create(name='english only')
+        user = create_user('admin', 'admin@example.com', 'admin',
+                           is_staff=True, is_superuser=True)
+        self.client.force_login(user)
+        url = admin_reverse('test_addon_simple_changelist')
+        response = self.client.get(url, {'untranslated_in': 'fr'})
+        self.assertEqual([english.pk], [
+            obj.pk for obj in response.context['cl'].result_list])
+        response = self.client.get(url, {'translated_in': 'fr'})
+        self.assertEqual(
+            [self.simple1.pk, self.simple2.pk],
+            sorted(obj.pk for obj in response.context['cl'].result_list))
+        response = self.client.get(
+            url, {'translated_in': 'en', 'untranslated_in': 'de'})
+        self.assertEqual([english.pk], [
+            obj.pk for obj in response.context['cl'].result_list])
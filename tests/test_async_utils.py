@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import os
+import threading
+from unittest import skipIf
+
+from django.test import TransactionTestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils.translation import get_language, override
+
+from test_addon.models import Simple
+
+from aldryn_translation_tools.utils import aget_object_from_request
+
+from . import SimpleTransactionTestCase
+
+
+try:
+    import asyncio
+except ImportError:  # pragma: no cover
+    asyncio = None
+else:
+    from aldryn_translation_tools.async_utils import (
+        completed, get_database_executor, run_in_database_thread,
+    )
+
+
+class AsyncTestMixin(object):
+
+    def setUp(self):
+        super(AsyncTestMixin, self).setUp()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.addCleanup(asyncio.set_event_loop, None)
+        self.addCleanup(self.loop.close)
+
+    def run_async(self, awaitable):
+        return self.loop.run_until_complete(awaitable)
+
+
+@skipIf(asyncio is None, 'Needs Python 3')
+class TestAsyncUtils(AsyncTestMixin, TransactionTestCase):
+
+    def test_run_in_database_thread(self):
+        def get_thread_and_language(suffix):
+            return threading.current_thread(), get_language() + suffix
+
+        with override('fr'):
+            future = run_in_database_thread(get_thread_and_language, '!')
+        thread, language = self.run_async(future)
+        self.assertIsNot(threading.current_thread(), thread)
+        self.assertEqual('fr!', language)
+
+    def test_completed(self):
+        future = completed(42)
+        self.assertTrue(future.done())
+        self.assertEqual(42, self.run_async(future))
+
+    def test_settings_change_clears_executor(self):
+        executor = get_database_executor()
+        self.assertIs(executor, get_database_executor())
+        self.assertEqual(min(32, (os.cpu_count() or 1) + 4),
+                         executor._max_workers)
+        with override_settings(ALDRYN_TRANSLATION_TOOLS_ASYNC_MAX_WORKERS=2):
+            self.assertIsNot(executor, get_database_executor())
+            self.assertEqual(2, get_database_executor()._max_workers)
+
+
+@skipIf(asyncio is None, 'Needs Python 3')
+class TestAknownTranslationGetter(AsyncTestMixin, TransactionTestCase):
+
+    def setUp(self):
+        super(TestAknownTranslationGetter, self).setUp()
+        self.simple = Simple()
+        for language in ['en', 'fr']:
+            self.simple.set_current_language(language)
+            self.simple.name = 'Simple {0}'.format(language)
+            self.simple.save()
+
+    def test_aknown_translation_getter(self):
+        simple = Simple.objects.get(pk=self.simple.pk)
+        for language in ['en', 'de', 'fr', 'it']:
+            expected = simple.known_translation_getter('name', 'none', language)
+            self.assertEqual(expected, self.run_async(
+                simple.aknown_translation_getter('name', 'none', language)))
+        with override('de'):
+            future = simple.aknown_translation_getter('name')
+        self.assertEqual(('Simple en', 'en'), self.run_async(future))
+
+    def test_aknown_translation_getter_prefetched(self):
+        simple = Simple.objects.prefetch_translations().get(pk=self.simple.pk)
+        with self.assertNumQueries(0):
+            future = simple.aknown_translation_getter('name', None, 'it')
+        # Answered without leaving the event loop.
+        self.assertTrue(future.done())
+        self.assertEqual(('Simple fr', 'fr'), self.run_async(future))
+
+    def test_aknown_translation_getter_looks_up_prefetched_once(self):
+        calls = []
+        for simple in [Simple.objects.get(pk=self.simple.pk),
+                       Simple.objects.prefetch_translations().get(
+                           pk=self.simple.pk)]:
+            lookup = simple._get_prefetched_known_translation
+            simple._get_prefetched_known_translation = (
+                lambda *args: calls.append(args) or lookup(*args))
+            self.assertEqual(('Simple fr', 'fr'), self.run_async(
+                simple.aknown_translation_getter('name', None, 'it')))
+        self.assertEqual(2, len(calls))
+
+
+@skipIf(asyncio is None, 'Needs Python 3')
+class TestAgetObjectFromRequest(AsyncTestMixin, SimpleTransactionTestCase):
+
+    def setUp(self):
+        super(TestAgetObjectFromRequest, self).setUp()
+        self.reload_urls()
+
+    def get_object_request(self, url):
+        request = self.request_factory.get(url)
+        request.LANGUAGE_CODE = 'en'
+        request.current_page = self.page
+        request.user = self.user
+        request.resolver_match = resolve(request.path)
+        return request
+
+    def test_aget_object_from_request(self):
+        self.simple1.set_current_language('en')
+        slug_url = self.simple1.get_absolute_url('en')
+        pk_url = slug_url.replace(
+            '/{0}/'.format(self.simple1.slug),
+            '/{0}/'.format(self.simple1.pk))
+        for url in [slug_url, pk_url]:
+            simple = self.run_async(aget_object_from_request(
+                Simple, self.get_object_request(url)))
+            self.assertEqual(self.simple1.pk, simple.pk)
+            self.assertEqual('en', simple.get_current_language())
+
+        missing_url = slug_url.replace(self.simple1.slug, 'missing')
+        self.assertIsNone(self.run_async(aget_object_from_request(
+            Simple, self.get_object_request(missing_url))))
+
+    def test_aget_object_from_empty_request(self):
+        request = self.get_object_request(reverse('simple:simple-root'))
+        future = aget_object_from_request(Simple, request)
+        self.assertTrue(future.done())
+        self.assertIsNone(self.run_async(future))
+
+    def test_request_memo(self):
+        cache_settings = override_settings(
+            ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE=True,
+            ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE_ALIAS=None)
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+
+        request = self.get_object_request(self.simple1.get_absolute_url('en'))
+        simple = self.run_async(aget_object_from_request(Simple, request))
+        self.assertEqual(self.simple1.pk, simple.pk)
+        with self.assertNumQueries(0):
+            future = aget_object_from_request(Simple, request)
+        self.assertTrue(future.done())
+        self.assertIs(simple, self.run_async(future))
+
+
+@skipIf(asyncio is None, 'Needs Python 3')
+class TestAsyncSlugs(AsyncTestMixin, TransactionTestCase):
+
+    def test_asave(self):
+        simple = Simple(name='Async one')
+        self.run_async(simple.asave())
+        self.assertEqual('async-one', simple.slug)
+        self.assertEqual('async-one', Simple.objects.get(pk=simple.pk).slug)
+
+        simples = [Simple(name='Async one') for _ in range(3)]
+        # Concurrent saves of Simple may pick the same slug, as it does not
+        # use the slug registry, and SQLite serializes the writes anyway.
+        with override_settings(ALDRYN_TRANSLATION_TOOLS_ASYNC_MAX_WORKERS=1):
+            self.run_async(asyncio.gather(*[
+                simple.asave() for simple in simples]))
+        self.assertEqual(['async-one-1', 'async-one-2', 'async-one-3'],
+                         sorted(simple.slug for simple in simples))
+
+    def test_asave_in_language(self):
+        simple = Simple()
+        simple.set_current_language('fr')
+        simple.name = 'Async un'
+        with override('de'):
+            self.run_async(simple.asave())
+        simple = Simple.objects.language('fr').get(pk=simple.pk)
+        self.assertEqual(['fr'], list(simple.get_available_languages()))
+        self.assertEqual('async-un', simple.slug)
+
+    def test_amake_new_slug(self):
+        Simple.objects.create(name='Async one')
+        simple = Simple(name='Async one')
+        self.assertTrue(self.run_async(simple._aslug_exists('async-one')))
+        self.assertFalse(self.run_async(simple._aslug_exists('async-one-1')))
+        self.assertEqual('async-one-1', self.run_async(simple.amake_new_slug()))
+        self.assertEqual('other', self.run_async(
+            simple.amake_new_slug(slug='other')))
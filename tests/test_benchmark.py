@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.utils.six.moves import StringIO
+
+
+class TestBenchmark(TransactionTestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+    def test_benchmark(self):
+        path = os.path.join(self.output_dir, 'benchmark.json')
+        stdout = StringIO()
+        call_command('benchmark', objects=6, languages=2, duplicates=3,
+                     iterations=1, repeat=1, json=path, stdout=stdout)
+        self.assertIn('Seeded 6 objects in 2 languages', stdout.getvalue())
+        with open(path) as results_file:
+            output = json.load(results_file)
+        self.assertEqual(['en', 'de'], output['parameters']['languages'])
+        results = dict(
+            (result['name'], result) for result in output['results'])
+        # The three duplicates, then the free candidate.
+        self.assertEqual(4, results['Simple.make_new_slug (scan)'][
+            'queries_per_call'])
+        self.assertEqual(1, results['Simple.make_new_slug (prefetch)'][
+            'queries_per_call'])
+        self.assertEqual(2, results['Simple.bulk_known_translation_getter'][
+            'queries_per_call'])
+        self.assertEqual(1, results[
+            'AllTranslationsMixin.all_translations (prepared)'][
+            'queries_per_call'])
+        for result in output['results']:
+            self.assertGreater(result['usec_per_call'], 0)
+
+        stderr = StringIO()
+        call_command('benchmark', 'slug_meta', objects=0, duplicates=0,
+                     iterations=1, repeat=1, compare=path, stdout=StringIO(),
+                     stderr=stderr)
+        self.assertIn('Simple.slug_meta (cached): ', stderr.getvalue())
+        self.assertNotIn('make_new_slug', stderr.getvalue())
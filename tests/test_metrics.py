@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import socket
+
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import override
+
+from test_addon.models import Simple
+
+from aldryn_translation_tools.metrics import (
+    InMemoryMetricsBackend, NullMetricsBackend, QueryCounter, StatsDMetricsBackend,
+    count_logged_queries, count_queries, get_metrics_backend,
+)
+
+
+class TestMetrics(TransactionTestCase):
+
+    def setUp(self):
+        settings_override = override_settings(
+            ALDRYN_TRANSLATION_TOOLS_METRICS_BACKEND=(
+                'aldryn_translation_tools.metrics.InMemoryMetricsBackend'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.metrics = get_metrics_backend()
+
+    def create(self, language, name):
+        simple = Simple()
+        simple.set_current_language(language)
+        simple.name = name
+        simple.save()
+        return simple
+
+    def test_default_backend(self):
+        self.assertIsInstance(self.metrics, InMemoryMetricsBackend)
+        with override_settings(ALDRYN_TRANSLATION_TOOLS_METRICS_BACKEND=(
+                NullMetricsBackend)):
+            self.assertFalse(get_metrics_backend().enabled)
+            self.create('en', 'not recorded')
+        self.assertEqual([], self.metrics.records)
+
+    def test_slugs(self):
+        self.create('en', 'same')
+        self.create('en', 'same')
+        self.create('de', 'same')
+        self.assertEqual(
+            [0, 1, 0], self.metrics.get_values('slug.collisions'))
+        self.assertEqual(
+            [0], self.metrics.get_values('slug.collisions', language='de'))
+        self.assertEqual(
+            3, len(self.metrics.get_values(
+                'slug.save', model='test_addon.simple')))
+        self.assertEqual(
+            # The existence check of each candidate.
+            [1, 2, 1], self.metrics.get_values('slug.make_new_slug.queries'))
+        for queries in self.metrics.get_values('slug.save.queries'):
+            self.assertGreater(queries, 1)
+
+    def test_fallbacks(self):
+        english = self.create('en', 'english')
+        french = self.create('fr', 'french')
+        self.metrics.clear()
+        with override('de'):
+            english.known_translation_getter('name')
+            french.known_translation_getter('name')
+        english.known_translation_getter('name', language_code='en')
+        # Falling back from German to English.
+        self.assertEqual(
+            [1, 0], self.metrics.get_values('translation.fallback_depth'))
+        self.assertEqual(
+            [1], self.metrics.get_values(
+                'translation.fallback_misses', language='de'))
+        # Fetching the available languages.
+        self.assertEqual(
+            [1, 1, 1], self.metrics.get_values(
+                'translation.known_translation_getter.queries'))
+
+        Simple.bulk_known_translation_getter(
+            [english, french], 'name', language_code='de')
+        self.assertEqual(
+            [1, 0, 1], self.metrics.get_values('translation.fallback_depth'))
+        self.assertEqual(
+            [1, 1], self.metrics.get_values('translation.fallback_misses'))
+
+
+class TestCountQueries(TransactionTestCase):
+
+    def count(self, context_manager):
+        with context_manager as counter:
+            list(Simple.objects.all())
+            list(Simple.objects.all())
+        return counter.count
+
+    def test_count_queries(self):
+        self.assertEqual(2, self.count(count_queries(connection)))
+
+    def test_count_logged_queries(self):
+        # The way queries are counted on Django < 2.0.
+        self.assertEqual(2, self.count(
+            count_logged_queries(connection, QueryCounter())))
+        self.assertFalse(connection.force_debug_cursor)
+        self.assertEqual(0, len(connection.queries_log))
+        # The queries are kept if they are logged anyway.
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(2, self.count(
+                count_logged_queries(connection, QueryCounter())))
+            list(Simple.objects.all())
+        self.assertEqual(3, len(context.captured_queries))
+
+
+class TestStatsDMetricsBackend(TransactionTestCase):
+
+    def test_format(self):
+        lines = []
+        backend = StatsDMetricsBackend(sink=lines.append)
+        backend.increment('misses', tags={'language': 'de'})
+        backend.observe('depth', 2)
+        backend.timing('save', 1.5)
+        self.assertEqual([
+            'aldryn_translation_tools.misses:1|c',
+            'aldryn_translation_tools.depth:2|h',
+            'aldryn_translation_tools.save:1.500|ms',
+        ], lines)
+
+        lines = []
+        backend = StatsDMetricsBackend(
+            prefix='', tag_format='dogstatsd', sink=lines.append)
+        backend.increment('misses', 2, tags={'model': 'a.b', 'language': 'de'})
+        self.assertEqual(['misses:2|c|#language:de,model:a.b'], lines)
+
+    def test_udp(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(server.close)
+        server.bind(('127.0.0.1', 0))
+        server.settimeout(5)
+        backend = StatsDMetricsBackend(
+            host='127.0.0.1', port=server.getsockname()[1])
+        backend.increment('saves')
+        self.assertEqual(
+            b'aldryn_translation_tools.saves:1|c', server.recv(1024))
@@ -2,10 +2,22 @@
 
 from __future__ import unicode_literals
 
+import threading
+import time
+from unittest import skipIf
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection
 from django.test import TransactionTestCase
-from django.utils.translation import ugettext_lazy as _
+from django.test.utils import CaptureQueriesContext
+from django.utils.six.moves import StringIO
+from django.utils.translation import override, ugettext_lazy as _
+
+from test_addon.models import Complex, Historic, Reserved, ReservedUUID, Simple, Unconventional
 
-from test_addon.models import Complex, Simple, Unconventional
+from aldryn_translation_tools.registry import SlugHistory, SlugReservation
+from aldryn_translation_tools.slug_counters import LRUSlugCounters
 
 
 class TestTranslatableAutoSlugifyMixin(TransactionTestCase):
@@ -147,3 +159,668 @@ class TestTranslatableAutoSlugifyMixin(TransactionTestCase):
         complex1.set_current_language('en')
         complex1.save()
         self.assertEquals('complex-without-name', complex1.slug)
+
+    def _create_simples(self, name, language, count):
+        slugs = []
+        for r in range(count):
+            simple = Simple()
+            simple.set_current_language(language)
+            simple.name = name
+            simple.save()
+            slugs.append(simple.slug)
+        return slugs
+
+    def test_prefetch_collisions(self):
+        Simple.slug_max_length = 6
+        try:
+            expected = self._create_simples('Simple', 'en', 15)
+            Simple.slug_prefetch_collisions = True
+            try:
+                slugs = self._create_simples('Simple', 'fr', 15)
+            finally:
+                Simple.slug_prefetch_collisions = False
+        finally:
+            Simple.slug_max_length = None
+        self.assertEqual(len(set(slugs)), 15)
+        self.assertEqual(expected, slugs)
+
+    def test_prefetch_collisions_single_query(self):
+        self._create_simples('Simple', 'en', 5)
+        simple = Simple()
+        simple.set_current_language('en')
+        simple.name = 'Simple'
+        Simple.slug_prefetch_collisions = True
+        try:
+            with self.assertNumQueries(1):
+                slug = simple.make_new_slug()
+        finally:
+            Simple.slug_prefetch_collisions = False
+        self.assertEqual('simple-5', slug)
+
+    def test_prefetch_collisions_ignores_other_slugs(self):
+        self._create_simples('Simple', 'en', 2)
+        self._create_simples('Simple test', 'en', 2)
+        simple = Simple()
+        simple.set_current_language('en')
+        simple.name = 'Simple'
+        Simple.slug_prefetch_collisions = True
+        try:
+            taken = simple._get_taken_slugs('simple')
+            slug = simple.make_new_slug()
+        finally:
+            Simple.slug_prefetch_collisions = False
+        self.assertIn('simple', taken)
+        self.assertIn('simple-1', taken)
+        self.assertNotIn('simple-test', taken)
+        self.assertEqual('simple-2', slug)
+
+    def test_prefetch_collisions_ignores_near_misses(self):
+        for name in ['Press release', 'Press release 1', 'Press release q 3',
+                     'Press release about 2019', 'Press releases',
+                     'Press release 123456', 'Press release 1234567',
+                     'Press release quarte', 'Press release qua 12']:
+            self._create_simples(name, 'en', 1)
+        simple = Simple()
+        simple.set_current_language('en')
+        self.assertEqual(
+            {'press-release', 'press-release-1', 'press-release-123456'},
+            simple._get_taken_slugs('press-release'))
+
+        # The slug is truncated further for longer indexes.
+        simple.slug_max_length = 20
+        self.assertEqual(
+            {'press-release-quarte', 'press-release-qua-12',
+             'press-release-123456'},
+            simple._get_taken_slugs('press-release-quarte'))
+
+    def test_prefetch_collisions_filter_lookup(self):
+        self._create_simples('Simple', 'en', 2)
+        simple = Simple()
+        simple.set_current_language('en')
+        simple.name = 'Simple'
+        Simple.slug_prefetch_collisions = True
+        try:
+            Simple.raw_slug_filter_string = 'translations__{0}__exact'
+            self.assertEqual({'simple', 'simple-1'},
+                             simple._get_taken_slugs('simple'))
+            with self.assertNumQueries(1):
+                self.assertEqual('simple-2', simple.make_new_slug())
+
+            # Other lookups are checked one candidate at a time.
+            Simple.raw_slug_filter_string = 'translations__{0}__iexact'
+            self.assertIsNone(simple._get_taken_slugs('simple'))
+            with self.assertNumQueries(3):
+                self.assertEqual('SIMPLE-2', simple.make_new_slug(
+                    slug='SIMPLE'))
+        finally:
+            Simple.slug_prefetch_collisions = False
+            Simple.raw_slug_filter_string = 'translations__{0}'
+
+    def test_assign_slugs(self):
+        expected = self._create_simples('Simple', 'en', 3)
+        expected += self._create_simples('Other', 'en', 2)
+        Simple.objects.all().delete()
+        self._create_simples('Simple', 'en', 1)
+
+        objects = []
+        for name in ['Simple', 'Simple', 'Other', 'Other']:
+            simple = Simple()
+            simple.set_current_language('en')
+            simple.name = name
+            objects.append(simple)
+        Simple.assign_slugs(objects, 'en')
+        self.assertEqual(expected[1:], [obj.slug for obj in objects])
+
+    def test_assign_slugs_keeps_free_slugs(self):
+        self._create_simples('Simple', 'en', 1)
+        objects = []
+        for slug in ['simple', 'free', 'free']:
+            simple = Simple()
+            simple.set_current_language('en')
+            simple.name = 'Simple'
+            simple.slug = slug
+            objects.append(simple)
+        Simple.assign_slugs(objects, 'en')
+        self.assertEqual(['simple-1', 'free', 'free-1'],
+                         [obj.slug for obj in objects])
+
+    def test_assign_slugs_filter_lookup(self):
+        self._create_simples('Simple', 'en', 2)
+        try:
+            for lookup, queries in [('exact', 1), ('iexact', 5)]:
+                Simple.raw_slug_filter_string = 'translations__{0}__' + lookup
+                objects = []
+                for name in ['Simple', 'Simple', 'Other']:
+                    simple = Simple()
+                    simple.set_current_language('en')
+                    simple.name = name
+                    objects.append(simple)
+                with self.assertNumQueries(queries):
+                    Simple.assign_slugs(objects, 'en')
+                self.assertEqual(['simple-2', 'simple-3', 'other'],
+                                 [obj.slug for obj in objects])
+        finally:
+            Simple.raw_slug_filter_string = 'translations__{0}'
+
+    def test_assign_slugs_queries(self):
+        # Resolving the slugs of 1000 objects using 10 distinct titles takes a
+        # single query, where saving them one by one takes at least 1000.
+        self._create_simples('Title 0', 'en', 5)
+        objects = []
+        for r in range(1000):
+            simple = Simple()
+            simple.set_current_language('en')
+            simple.name = 'Title {0}'.format(r % 10)
+            objects.append(simple)
+        with self.assertNumQueries(1):
+            Simple.assign_slugs(objects, 'en')
+        slugs = [obj.slug for obj in objects]
+        self.assertEqual(len(set(slugs)), 1000)
+        self.assertEqual('title-0-5', slugs[0])
+        self.assertEqual('title-1', slugs[1])
+        self.assertEqual('title-1-1', slugs[11])
+
+    def _count_slug_queries(self, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            func(*args, **kwargs)
+        queries = [query['sql'] for query in context.captured_queries]
+        return len([sql for sql in queries
+                    if sql.startswith('SELECT') and '"slug" = ' in sql])
+
+    def test_slug_counters(self):
+        Simple.slug_counters = LRUSlugCounters()
+        try:
+            slugs = self._create_simples('Counted', 'en', 5)
+            self.assertEqual(
+                ['counted', 'counted-1', 'counted-2', 'counted-3', 'counted-4'],
+                slugs)
+            simple = Simple()
+            simple.set_current_language('en')
+            simple.name = 'Counted'
+            # The slug itself, then the candidate of the counter.
+            self.assertEqual(2, self._count_slug_queries(simple.save))
+            self.assertEqual('counted-5', simple.slug)
+
+            # Stale counters fall back to checking the candidates.
+            Simple.slug_counters = LRUSlugCounters()
+            Simple.slug_counters.set_next_index(Simple, 'en', 'counted', 2)
+            self.assertEqual(['counted-6'],
+                             self._create_simples('Counted', 'en', 1))
+            self.assertEqual(7, Simple.slug_counters.get_next_index(
+                Simple, 'en', 'counted'))
+
+            # The scan resumes after the taken candidate of the counter, e.g.
+            # when another process allocated it.
+            Simple.slug_counters = LRUSlugCounters()
+            Simple.slug_counters.set_next_index(Simple, 'en', 'counted', 5)
+            simple = Simple()
+            simple.set_current_language('en')
+            simple.name = 'Counted'
+            self.assertEqual(4, self._count_slug_queries(simple.save))
+            self.assertEqual('counted-7', simple.slug)
+            self.assertEqual(8, Simple.slug_counters.get_next_index(
+                Simple, 'en', 'counted'))
+
+            # The slug itself is used again once it is free.
+            Simple.objects.all().delete()
+            self.assertEqual(['counted', 'counted-8'],
+                             self._create_simples('Counted', 'en', 2))
+        finally:
+            del Simple.slug_counters
+
+    def test_unchanged_slug_is_not_checked(self):
+        self._create_simples('Simple', 'en', 1)
+        simple = Simple.objects.language('en').get()
+        self.assertEqual('simple', simple.slug)
+        self.assertEqual(0, self._count_slug_queries(simple.save))
+        self.assertEqual(1, self._count_slug_queries(
+            simple.save, force_slug_check=True))
+
+    def test_changed_slug_is_checked(self):
+        self._create_simples('Simple', 'en', 1)
+        simple = Simple()
+        simple.set_current_language('en')
+        simple.name = 'Other'
+        simple.save()
+        self.assertEqual('other', simple.slug)
+
+        simple = Simple.objects.language('en').get(pk=simple.pk)
+        simple.slug = 'simple'
+        simple.save()
+        self.assertEqual('simple-1', simple.slug)
+
+        # A changed source triggers the check too.
+        simple = Simple.objects.language('en').get(pk=simple.pk)
+        simple.name = 'Simple'
+        self.assertEqual(1, self._count_slug_queries(simple.save))
+        self.assertEqual('simple-1', simple.slug)
+
+    def test_slug_collision_is_detected_when_forced(self):
+        simple1, simple2 = [Simple(), Simple()]
+        for simple, name in [(simple1, 'One'), (simple2, 'Two')]:
+            simple.set_current_language('en')
+            simple.name = name
+            simple.save()
+        # Make both slugs the same behind the back of the mixin.
+        simple2.translations.update(slug='one')
+        simple2 = Simple.objects.language('en').get(pk=simple2.pk)
+        simple2.save()
+        self.assertEqual('one', simple2.slug)
+        simple2.save(force_slug_check=True)
+        self.assertEqual('one-1', simple2.slug)
+
+    def test_slug_meta_cache(self):
+        unconventional = Unconventional()
+        unconventional.set_current_language('en')
+        Unconventional._slug_meta_cache.clear()
+        self.assertEqual(64, unconventional.get_slug_max_length())
+        self.assertIn((Unconventional, 'slug_max_length'),
+                      Unconventional._slug_meta_cache)
+        self.assertEqual('translations__unique_slug',
+                         unconventional._get_slug_filter())
+        self.assertEqual('unconventional-model-without-short-title',
+                         unconventional.get_slug_default())
+
+        # Replacing the class attributes invalidates the cached values.
+        Unconventional.slug_default = _('unnamed-unconventional-object')
+        Unconventional.raw_slug_filter_string = 'translations__{0}__iexact'
+        try:
+            self.assertEqual('unnamed-unconventional-object',
+                             unconventional.get_slug_default())
+            self.assertEqual('translations__unique_slug__iexact',
+                             unconventional._get_slug_filter())
+        finally:
+            Unconventional.slug_default = None
+            Unconventional.raw_slug_filter_string = 'translations__{0}'
+        self.assertEqual('unconventional-model-without-short-title',
+                         unconventional.get_slug_default())
+        self.assertEqual('translations__unique_slug',
+                         unconventional._get_slug_filter())
+
+    def test_slug_default_cache_per_language(self):
+        Unconventional.slug_default = _('Yes')
+        try:
+            unconventional = Unconventional()
+            with override('en'):
+                self.assertEqual('Yes', unconventional.get_slug_default())
+            with override('de'):
+                self.assertEqual('Ja', unconventional.get_slug_default())
+        finally:
+            Unconventional.slug_default = None
+
+
+class TestSlugRegistry(TransactionTestCase):
+
+    def reservations(self, obj=None):
+        qs = SlugReservation.objects.order_by('scope', 'slug')
+        if obj is not None:
+            qs = qs.filter(object_id=obj.pk)
+        return list(qs.values_list('scope', 'slug'))
+
+    def test_reserves_slugs(self):
+        reserved = Reserved.objects.create(name='reserved')
+        reserved.set_current_language('de')
+        reserved.name = 'reserviert'
+        reserved.save()
+        self.assertEqual([('de', 'reserviert'), ('en', 'reserved')],
+                         self.reservations(reserved))
+
+        # Slugs are unique per language.
+        other = Reserved.objects.create(name='reserved')
+        self.assertEqual('reserved-1', other.slug)
+        other.set_current_language('de')
+        other.name = 'reserved'
+        other.save()
+        self.assertEqual('reserved', other.slug)
+
+    def test_checks_registry(self):
+        reserved = Reserved.objects.create(name='reserved')
+        other = Reserved(name='other')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(other._slug_exists('reserved'))
+            self.assertFalse(reserved._slug_exists('reserved'))
+        self.assertEqual(2, len(queries))
+        for query in queries:
+            self.assertIn('slugreservation', query['sql'])
+            self.assertNotIn('test_addon_reserved_translation', query['sql'])
+
+    def test_releases_slugs(self):
+        reserved = Reserved.objects.create(name='reserved')
+        reserved.slug = 'renamed'
+        reserved.save()
+        self.assertEqual([('en', 'renamed')], self.reservations(reserved))
+        self.assertEqual('reserved', Reserved.objects.create(name='reserved').slug)
+
+        reserved.set_current_language('de')
+        reserved.name = 'reserviert'
+        reserved.save()
+        reserved.delete_translation('de')
+        self.assertEqual([('en', 'renamed')], self.reservations(reserved))
+
+        Reserved.objects.filter(pk=reserved.pk).delete()
+        self.assertEqual([], self.reservations(reserved))
+        self.assertEqual(1, SlugReservation.objects.count())
+
+    def test_releases_slugs_once_per_object(self):
+        reserved = Reserved.objects.create(name='reserved')
+        for language in ['de', 'fr']:
+            reserved.set_current_language(language)
+            reserved.name = 'reserved'
+            reserved.save()
+        translations = Reserved._parler_meta.root_model.objects
+        with CaptureQueriesContext(connection) as context:
+            translations.filter(language_code__in=['de', 'fr']).delete()
+        self.assertEqual([('en', 'reserved')], self.reservations(reserved))
+        queries = [query['sql'] for query in context.captured_queries
+                   if 'slugreservation' in query['sql']]
+        # Reading, then collecting and deleting the stale reservations.
+        self.assertEqual(3, len(queries))
+
+        # The reservations of deleted objects are only deleted.
+        with CaptureQueriesContext(connection) as context:
+            reserved.delete()
+        self.assertEqual([], self.reservations())
+        queries = [query['sql'] for query in context.captured_queries
+                   if 'slugreservation' in query['sql']]
+        self.assertEqual(2, len(queries))
+
+    def test_uuid_pk(self):
+        reserved = ReservedUUID.objects.create(name='reserved')
+        self.assertEqual([('en', 'reserved')], self.reservations(reserved))
+        other = ReservedUUID.objects.create(name='reserved')
+        self.assertEqual('reserved-1', other.slug)
+        # Saving again keeps the reservation.
+        reserved.save(force_slug_check=True)
+        self.assertEqual('reserved', reserved.slug)
+        self.assertEqual(2, SlugReservation.objects.count())
+        reserved.delete()
+        self.assertEqual([('en', 'reserved-1')], self.reservations())
+
+    def test_globally_unique(self):
+        Reserved.slug_globally_unique = True
+        try:
+            reserved = Reserved.objects.create(name='reserved')
+            reserved.set_current_language('de')
+            reserved.name = 'reserved'
+            reserved.save()
+            self.assertEqual('reserved', reserved.slug)
+            self.assertEqual([('', 'reserved')], self.reservations(reserved))
+
+            other = Reserved()
+            other.set_current_language('fr')
+            other.name = 'reserved'
+            other.save()
+            self.assertEqual('reserved-1', other.slug)
+        finally:
+            del Reserved.slug_globally_unique
+
+    def test_concurrent_reservation(self):
+        # Another object reserves the slug after it was found free.
+        other = Reserved.objects.create(name='other')
+        SlugReservation.objects.create(
+            content_type=ContentType.objects.get_for_model(Reserved),
+            object_id=other.pk, scope='en', slug='race')
+        reserved = Reserved(name='race')
+        checks = []
+
+        def stale_slug_exists(*args, **kwargs):
+            checks.append(args)
+            if len(checks) == 1:
+                return False
+            return Reserved._slug_exists(reserved, *args, **kwargs)
+
+        reserved._slug_exists = stale_slug_exists
+        reserved.save()
+        self.assertEqual('race-1', reserved.slug)
+        self.assertEqual('race-1', Reserved.objects.get(pk=reserved.pk).slug)
+        self.assertEqual([('en', 'race-1')], self.reservations(reserved))
+
+    def test_concurrent_reservation_other_language(self):
+        reserved = Reserved(name='apple')
+        reserved.set_current_language('de')
+        reserved.name = 'Apfel'
+        reserved.slug = 'apfel'
+        reserved.set_current_language('en')
+        # Another object reserves the German slug before the save.
+        other = Reserved.objects.create(name='other')
+        SlugReservation.objects.create(
+            content_type=ContentType.objects.get_for_model(Reserved),
+            object_id=other.pk, scope='de', slug='apfel')
+        reserved.save()
+        self.assertEqual('en', reserved.get_current_language())
+        self.assertEqual('apple', reserved.slug)
+        self.assertEqual('apfel-1', Reserved.objects.language('de').get(
+            pk=reserved.pk).slug)
+        self.assertEqual([('de', 'apfel-1'), ('en', 'apple')],
+                         self.reservations(reserved))
+
+    def test_concurrent_reservation_attempts(self):
+        Reserved.objects.create(name='race')
+        reserved = Reserved(name='race')
+        reserved.slug_allocation_attempts = 2
+        # Every check misses the reservation of the other object.
+        reserved._slug_exists = lambda *args, **kwargs: False
+        with self.assertRaises(IntegrityError):
+            reserved.save()
+        self.assertEqual(1, Reserved.objects.count())
+        self.assertEqual(1, SlugReservation.objects.count())
+
+    @skipIf(connection.vendor not in ('sqlite', 'postgresql'),
+            'Concurrent transactions are only tested on SQLite and PostgreSQL')
+    def test_parallel_saves(self):
+        workers = 4
+        saves = 10
+        errors = []
+
+        def create():
+            while True:
+                try:
+                    return Reserved.objects.create(name='parallel')
+                except OperationalError:
+                    # SQLite's shared cache raises instead of waiting for
+                    # the locks held by other connections.
+                    if connection.vendor != 'sqlite':
+                        raise
+                    time.sleep(0.001)
+
+        def work():
+            try:
+                for index in range(saves):
+                    create()
+            except Exception as e:  # pragma: no cover
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work) for index in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        slugs = Reserved._parler_meta.root_model.objects.values_list(
+            'slug', flat=True)
+        self.assertEqual(workers * saves, len(set(slugs)))
+        self.assertEqual(set(slugs), set(
+            SlugReservation.objects.values_list('slug', flat=True)))
+
+    def test_assign_slugs(self):
+        Reserved.objects.create(name='reserved')
+        objects = Reserved.assign_slugs(
+            [Reserved(name='reserved'), Reserved(name='reserved')], 'en')
+        self.assertEqual(['reserved-1', 'reserved-2'],
+                         [obj.slug for obj in objects])
+
+    def test_backfill(self):
+        first = Reserved.objects.create(name='first')
+        second = Reserved.objects.create(name='second')
+        SlugReservation.objects.all().delete()
+        # A stale reservation, e.g. of an object deleted with raw SQL.
+        SlugReservation.objects.create(
+            content_type=ContentType.objects.get_for_model(Reserved),
+            object_id=second.pk + 1, scope='en', slug='second')
+
+        stdout, stderr = StringIO(), StringIO()
+        call_command('backfill_slug_registry', batch_size=1,
+                     stdout=stdout, stderr=stderr)
+        self.assertIn(
+            'Reserved the slugs of 1 objects of test_addon.Reserved '
+            '(1 conflicts)', stdout.getvalue())
+        self.assertIn('The slugs of test_addon.Reserved {0} are reserved by '
+                      'other objects'.format(second.pk), stderr.getvalue())
+        self.assertEqual([('en', 'first')], self.reservations(first))
+
+        stdout = StringIO()
+        call_command('backfill_slug_registry', 'test_addon.Reserved',
+                     clear=True, stdout=stdout)
+        self.assertIn('(0 conflicts)', stdout.getvalue())
+        self.assertEqual([('en', 'second')], self.reservations(second))
+        self.assertEqual(2, SlugReservation.objects.count())
+
+    def test_backfill_invalid_model(self):
+        with self.assertRaises(CommandError):
+            call_command('backfill_slug_registry', 'test_addon.Untranslated')
+
+
+class TestSlugHistory(TransactionTestCase):
+
+    def get_history(self):
+        return sorted(SlugHistory.objects.values_list(
+            'object_id', 'scope', 'slug'))
+
+    def test_record_former_slugs(self):
+        historic = Historic.objects.create(name='one')
+        self.assertEqual([], self.get_history())
+        historic.name = 'two'
+        historic.slug = ''
+        historic.save()
+        historic.name = 'unchanged slug'
+        historic.save()
+        historic.set_current_language('de')
+        historic.name = 'eins'
+        historic.save()
+        historic.slug = 'zwei'
+        historic.save()
+        self.assertEqual(
+            [(historic.pk, 'de', 'eins'), (historic.pk, 'en', 'one')],
+            self.get_history())
+
+    def test_replace_and_delete(self):
+        first = Historic.objects.create(name='one')
+        first.slug = 'first'
+        first.save()
+        second = Historic.objects.create(name='one')
+        second.slug = 'second'
+        second.save()
+        # The latest object to leave a slug gets its history entry.
+        self.assertEqual([(second.pk, 'en', 'one')], self.get_history())
+
+        second.delete()
+        self.assertEqual([], self.get_history())
+
+    def test_disabled(self):
+        simple = Simple.objects.create(name='one')
+        simple.slug = 'two'
+        simple.save()
+        self.assertEqual([], self.get_history())
+
+
+class TestTranslationHelperMixin(TransactionTestCase):
+
+    def setUp(self):
+        self.simples = []
+        for languages in [['en', 'de', 'fr'], ['fr'], ['de']]:
+            simple = Simple()
+            for language in languages:
+                simple.set_current_language(language)
+                simple.name = 'Simple {0}'.format(language)
+                simple.save()
+            self.simples.append(simple)
+
+    def test_known_translation_getter(self):
+        simple = Simple.objects.get(pk=self.simples[1].pk)
+        self.assertEqual(('Simple fr', 'fr'),
+                         simple.known_translation_getter('name', None, 'it'))
+        self.assertEqual(('none', None),
+                         simple.known_translation_getter('name', 'none', 'de'))
+
+    def test_bulk_known_translation_getter(self):
+        simples = list(Simple.objects.order_by('pk'))
+        for language in ['en', 'de', 'fr', 'it']:
+            expected = [
+                {field: simple.known_translation_getter(
+                    field, 'none', language_code=language)
+                 for field in ['name', 'slug']}
+                for simple in Simple.objects.order_by('pk')
+            ]
+            results = Simple.bulk_known_translation_getter(
+                simples, ['name', 'slug'], 'none', language_code=language)
+            self.assertEqual(expected, results)
+
+    def test_bulk_known_translation_getter_queries(self):
+        simples = list(Simple.objects.order_by('pk'))
+        with self.assertNumQueries(1):
+            results = Simple.bulk_known_translation_getter(
+                simples, 'name', language_code='it')
+        self.assertEqual([
+            {'name': ('Simple fr', 'fr')},
+            {'name': ('Simple fr', 'fr')},
+            {'name': (None, None)},
+        ], results)
+        # The translations are fetched once.
+        with self.assertNumQueries(0):
+            Simple.bulk_known_translation_getter(
+                simples, 'slug', language_code='en')
+
+    def test_known_translation_getter_prefetched(self):
+        expected = [
+            simple.known_translation_getter('name', 'none', language)
+            for simple in Simple.objects.order_by('pk')
+            for language in ['en', 'de', 'fr', 'it']
+        ]
+        # Fetching the objects and their translations, whatever the number
+        # of objects and fallbacks.
+        with self.assertNumQueries(2):
+            results = [
+                simple.known_translation_getter('name', 'none', language)
+                for simple in Simple.objects.prefetch_translations(
+                    'name').order_by('pk')
+                for language in ['en', 'de', 'fr', 'it']
+            ]
+        self.assertEqual(expected, results)
+
+    def test_with_known_translation(self):
+        for language in ['en', 'de', 'fr', 'it']:
+            expected = [
+                simple.known_translation_getter('name', None, language)
+                for simple in Simple.objects.order_by('pk')
+            ]
+            with self.assertNumQueries(1):
+                results = [
+                    (simple.known_name, simple.known_name_language)
+                    for simple in Simple.objects.with_known_translation(
+                        'name', language).order_by('pk')
+                ]
+            self.assertEqual(expected, results)
+
+    def test_with_known_translation_filter_and_order(self):
+        qs = Simple.objects.with_known_translation('slug', 'it', name='it_slug')
+        # "simple-fr-1", then "simple-fr".
+        self.assertEqual(
+            [self.simples[1].pk, self.simples[0].pk],
+            list(qs.filter(it_slug_language='fr').order_by(
+                '-it_slug').values_list('pk', flat=True)))
+        self.assertEqual(
+            [self.simples[2].pk],
+            list(qs.filter(it_slug__isnull=True).values_list('pk', flat=True)))
+
+    def test_known_translation_getter_prefetched_changes(self):
+        simple = Simple.objects.prefetch_translations().get(
+            pk=self.simples[0].pk)
+        simple.set_current_language('de')
+        simple.name = 'Changed'
+        with self.assertNumQueries(0):
+            self.assertEqual(('Changed', 'de'),
+                             simple.known_translation_getter('name', None, 'de'))
+            self.assertEqual(('Simple en', 'en'),
+                             simple.known_translation_getter('name', None, 'en'))
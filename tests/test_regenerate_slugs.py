@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase, override_settings
+from django.utils.six.moves import StringIO
+
+from test_addon.models import Complex, Historic, Reserved, Simple
+
+from aldryn_translation_tools.registry import SlugHistory, SlugReservation
+from aldryn_translation_tools.utils import _get_object_version_key
+
+
+class TestRegenerateSlugs(TransactionTestCase):
+
+    def setUp(self):
+        self.simples = []
+        for name in ['one', 'two', 'three', 'four']:
+            simple = Simple()
+            for language in ['en', 'de']:
+                simple.set_current_language(language)
+                simple.name = '{0} {1}'.format(name, language)
+                simple.save()
+            self.simples.append(simple)
+        # Change the sources without updating the slugs.
+        translations = Simple._parler_meta.root_model.objects
+        translations.filter(language_code='en').exclude(
+            master=self.simples[3]).update(name='Same name')
+        translations.filter(master=self.simples[3], language_code='en').update(
+            name='Other name')
+
+    def call(self, *args, **options):
+        stdout = StringIO()
+        call_command('regenerate_slugs', *args, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def get_slugs(self, language='en'):
+        return list(Simple._parler_meta.root_model.objects.filter(
+            language_code=language).order_by('master_id').values_list(
+            'slug', flat=True))
+
+    @override_settings(ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE=True)
+    def test_invalidates_object_cache(self):
+        key = _get_object_version_key(Simple)
+        cache.set(key, 5, None)
+        self.call('test_addon.Simple', languages=['de'])
+        # Nothing changed.
+        self.assertEqual(5, cache.get(key))
+        self.call('test_addon.Simple', languages=['en'], batch_size=2)
+        self.assertEqual(7, cache.get(key))
+
+    def test_regenerate(self):
+        output = self.call('test_addon.Simple', batch_size=3)
+        self.assertIn('Changed 4 of the 4 slugs of test_addon.Simple in en',
+                      output)
+        self.assertIn('Changed 0 of the 4 slugs of test_addon.Simple in de',
+                      output)
+        self.assertEqual(
+            ['same-name', 'same-name-1', 'same-name-2', 'other-name'],
+            self.get_slugs())
+        self.assertEqual(
+            ['one-de', 'two-de', 'three-de', 'four-de'], self.get_slugs('de'))
+
+        output = self.call('test_addon.Simple', languages=['en'])
+        self.assertIn('Changed 0 of the 4 slugs', output)
+
+    def test_filter_lookup(self):
+        Simple.raw_slug_filter_string = 'translations__{0}__iexact'
+        try:
+            self.call('test_addon.Simple', languages=['en'], batch_size=3)
+        finally:
+            Simple.raw_slug_filter_string = 'translations__{0}'
+        self.assertEqual(
+            ['same-name', 'same-name-1', 'same-name-2', 'other-name'],
+            self.get_slugs())
+
+    def test_idempotent(self):
+        # Each object wants the slug the other one uses.
+        translations = Simple._parler_meta.root_model.objects
+        translations.filter(master=self.simples[0], language_code='en').update(
+            name='Four en')
+        translations.filter(master=self.simples[3], language_code='en').update(
+            name='One en')
+        self.call('test_addon.Simple', languages=['en'], batch_size=1)
+        slugs = ['four-en', 'same-name', 'same-name-1', 'one-en']
+        self.assertEqual(slugs, self.get_slugs())
+        output = self.call('test_addon.Simple', languages=['en'], batch_size=1)
+        self.assertIn('Changed 0 of the 4 slugs', output)
+        self.assertEqual(slugs, self.get_slugs())
+
+    def test_dry_run(self):
+        output = self.call('test_addon.Simple', languages=['en'], dry_run=True)
+        self.assertIn('test_addon.Simple {0} en: one-en -> same-name'.format(
+            self.simples[0].pk), output)
+        self.assertIn('Would change 4 of the 4 slugs', output)
+        self.assertEqual(
+            ['one-en', 'two-en', 'three-en', 'four-en'], self.get_slugs())
+
+    def test_workers(self):
+        Complex.objects.create(name='complex', object_type='')
+        self.call('test_addon.Simple', 'test_addon.Complex', workers=2,
+                  batch_size=2)
+        self.assertEqual(
+            ['same-name', 'same-name-1', 'same-name-2', 'other-name'],
+            self.get_slugs())
+        # Complex overrides get_slug_source(), the default slug is used when
+        # it returns nothing.
+        self.assertEqual(['complex-without-name'], list(
+            Complex._parler_meta.root_model.objects.values_list(
+                'slug', flat=True)))
+
+    def test_checkpoint(self):
+        checkpoint_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, checkpoint_dir)
+        path = os.path.join(checkpoint_dir, 'checkpoint.json')
+        first = Simple._parler_meta.root_model.objects.get(
+            master=self.simples[0], language_code='en')
+        with open(path, 'w') as checkpoint_file:
+            json.dump({'test_addon.Simple': {'en': {'last_pk': first.pk}}},
+                      checkpoint_file)
+
+        output = self.call('test_addon.Simple', languages=['en'],
+                           checkpoint=path, batch_size=2)
+        self.assertIn('Changed 3 of the 3 slugs', output)
+        # The first translation was done before.
+        self.assertEqual(
+            ['one-en', 'same-name', 'same-name-1', 'other-name'],
+            self.get_slugs())
+        with open(path) as checkpoint_file:
+            self.assertTrue(
+                json.load(checkpoint_file)['test_addon.Simple']['en']['done'])
+
+        output = self.call('test_addon.Simple', languages=['en'],
+                           checkpoint=path)
+        self.assertIn('Skipped test_addon.Simple in en', output)
+
+    def test_registry(self):
+        reserved = Reserved.objects.create(name='reserved')
+        Reserved._parler_meta.root_model.objects.update(name='renamed')
+        self.call('test_addon.Reserved')
+        self.assertEqual(
+            ['renamed'], list(SlugReservation.objects.filter(
+                object_id=reserved.pk).values_list('slug', flat=True)))
+
+    def test_history(self):
+        historic = Historic.objects.create(name='historic')
+        Historic._parler_meta.root_model.objects.update(name='renamed')
+        self.call('test_addon.Historic')
+        self.assertEqual(
+            [(historic.pk, 'en', 'historic')],
+            list(SlugHistory.objects.values_list('object_id', 'scope', 'slug')))
+
+    def test_invalid_model(self):
+        with self.assertRaises(CommandError):
+            self.call('test_addon.Untranslated')
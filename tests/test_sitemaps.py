@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import gzip
+import os
+import shutil
+import tempfile
+from datetime import date
+
+from django.contrib.sitemaps import Sitemap
+from django.core.management import call_command
+from django.http import Http404
+from django.utils.six.moves import StringIO
+
+from test_addon.models import Simple
+
+from aldryn_translation_tools.sitemaps import I18NAlternatesSitemap, I18NSitemap, streaming_sitemap
+
+from . import SimpleTransactionTestCase
+
+
+class SimpleSitemap(I18NSitemap):
+    changefreq = 'weekly'
+    chunk_size = 1
+    prefetch_related = ('translations', )
+
+    def items(self):
+        return Simple.objects.translated(self.language).order_by('pk')
+
+
+class PrefetchingSimpleSitemap(I18NSitemap):
+
+    def items(self):
+        return Simple.objects.translated(self.language).prefetch_related(
+            'translations').order_by('pk')
+
+
+class SimpleAlternatesSitemap(I18NAlternatesSitemap):
+
+    def items(self):
+        return Simple.objects.translated(*self.languages).distinct().order_by('pk')
+
+
+class TestI18NSitemap(SimpleTransactionTestCase):
+
+    def setUp(self):
+        super(TestI18NSitemap, self).setUp()
+        self.reload_urls()
+
+    def get_expected_locations(self, language):
+        return [
+            'http://example.com{0}'.format(simple.get_absolute_url(language))
+            for simple in [self.simple1, self.simple2]
+        ]
+
+    def test_get_urls(self):
+        for language in ['en', 'de', 'fr']:
+            urls = SimpleSitemap(language).get_urls(site=self.site1)
+            self.assertEqual(self.get_expected_locations(language),
+                             [url['location'] for url in urls])
+            self.assertIn('/{0}/'.format(language), urls[0]['location'])
+            self.assertEqual('weekly', urls[0]['changefreq'])
+
+    def test_same_urls_as_sitemap(self):
+        sitemap = SimpleSitemap('fr')
+        urls = sitemap.get_urls(site=self.site1)
+        expected = Sitemap.get_urls(sitemap, site=self.site1)
+        self.assertEqual(expected, urls)
+
+    def test_chunked_queries(self):
+        sitemap = SimpleSitemap('de')
+        sitemap.get_urls(site=self.site1)
+        # Counting the items, fetching them and prefetching the translations
+        # of each of the two chunks.
+        with self.assertNumQueries(4):
+            sitemap.get_urls(site=self.site1)
+        sitemap.chunk_size = 500
+        with self.assertNumQueries(3):
+            sitemap.get_urls(site=self.site1)
+
+    def test_items_prefetch(self):
+        sitemap = PrefetchingSimpleSitemap('de')
+        sitemap.get_urls(site=self.site1)
+        # Fetched at once, with the prefetch of items().
+        with self.assertNumQueries(3):
+            urls = sitemap.get_urls(site=self.site1)
+        self.assertEqual(self.get_expected_locations('de'),
+                         [url['location'] for url in urls])
+        # Chunks get the prefetch of items() too.
+        sitemap.chunk_size = 1
+        with self.assertNumQueries(4):
+            self.assertEqual(urls, sitemap.get_urls(site=self.site1))
+        with self.assertNumQueries(4):
+            self.assertEqual(urls, list(sitemap.iter_urls(site=self.site1)))
+
+    def test_streaming_sitemap(self):
+        request = self.request_factory.get('/sitemap.xml')
+        response = streaming_sitemap(
+            request, {'simple-en': SimpleSitemap('en'), 'simple-fr': SimpleSitemap('fr')})
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(content.startswith('<?xml version="1.0"'))
+        for location in (self.get_expected_locations('en') + self.get_expected_locations('fr')):
+            self.assertIn('<url><loc>{0}</loc><changefreq>weekly</changefreq></url>'.format(location), content)
+        self.assertEqual('noindex, noodp, noarchive', response['X-Robots-Tag'])
+
+        request = self.request_factory.get('/sitemap.xml', {'p': 2})
+        with self.assertRaises(Http404):
+            streaming_sitemap(request, {'simple-en': SimpleSitemap('en')})
+        with self.assertRaises(Http404):
+            streaming_sitemap(request, {'simple-en': SimpleSitemap('en')}, section='simple-de')
+
+
+class TestI18NAlternatesSitemap(SimpleTransactionTestCase):
+
+    def setUp(self):
+        super(TestI18NAlternatesSitemap, self).setUp()
+        self.reload_urls()
+        self.simple3 = Simple()
+        self.simple3.set_current_language('fr')
+        self.simple3.name = 'objet trois'
+        self.simple3.save()
+
+    def test_get_urls(self):
+        sitemap = SimpleAlternatesSitemap(['en', 'de', 'fr'])
+        sitemap.get_urls(site=self.site1)
+        # Counting the items, fetching them and prefetching their translations.
+        with self.assertNumQueries(3):
+            urls = sitemap.get_urls(site=self.site1)
+
+        expected = []
+        for language in ['en', 'de', 'fr']:
+            for simple in [self.simple1, self.simple2, self.simple3]:
+                if simple.has_translation(language):
+                    expected.append((simple.pk, language, 'http://example.com{0}'.format(
+                        simple.get_absolute_url(language))))
+        self.assertEqual(expected, [
+            (url['item'].pk, url['language'], url['location']) for url in urls])
+        self.assertIn('/de/', urls[2]['location'])
+
+        alternates = [(language, location) for pk, language, location in expected if pk == self.simple1.pk]
+        self.assertEqual(alternates, [
+            (alternate['language'], alternate['location']) for alternate in urls[0]['alternates']])
+        self.assertEqual([('fr', expected[-1][2])], [
+            (alternate['language'], alternate['location']) for alternate in urls[-1]['alternates']])
+
+    def test_limit(self):
+        self.assertEqual(25000, SimpleAlternatesSitemap(['en', 'fr']).limit)
+        self.assertEqual(16666, SimpleAlternatesSitemap().limit)
+
+    def test_streaming_sitemap(self):
+        request = self.request_factory.get('/sitemap.xml')
+        response = streaming_sitemap(request, {'simple': SimpleAlternatesSitemap})
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('xmlns:xhtml="http://www.w3.org/1999/xhtml"', content)
+        location = 'http://example.com{0}'.format(self.simple3.get_absolute_url('fr'))
+        self.assertIn(
+            '<url><loc>{0}</loc><xhtml:link rel="alternate" hreflang="fr" href="{0}"/></url>'.format(location),
+            content)
+        self.assertEqual(7, content.count('<url>'))
+        self.assertEqual(19, content.count('<xhtml:link '))
+
+
+class DatedSimpleSitemap(SimpleSitemap):
+    latest = date(2019, 1, 1)
+
+    def get_latest_lastmod(self):
+        return self.latest
+
+
+SITEMAPS = {
+    'simple-en': DatedSimpleSitemap('en'),
+    'simple-fr': SimpleSitemap('fr'),
+}
+
+
+class TestWriteSitemaps(SimpleTransactionTestCase):
+
+    def setUp(self):
+        super(TestWriteSitemaps, self).setUp()
+        self.reload_urls()
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+        super(TestWriteSitemaps, self).tearDown()
+
+    def write_sitemaps(self, *args):
+        stdout = StringIO()
+        call_command('write_sitemaps', 'tests.test_sitemaps.SITEMAPS', self.output_dir,
+                     'https://example.com/sitemaps', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def read(self, file_name):
+        path = os.path.join(self.output_dir, file_name)
+        if file_name.endswith('.gz'):
+            with gzip.open(path) as sitemap_file:
+                return sitemap_file.read().decode('utf-8')
+        with open(path) as sitemap_file:
+            return sitemap_file.read()
+
+    def test_write_sitemaps(self):
+        output = self.write_sitemaps()
+        self.assertIn('Wrote section simple-en (1 files)', output)
+        self.assertIn('Wrote section simple-fr (1 files)', output)
+        self.assertEqual(
+            ['.sitemaps.json', 'simple-en-1.xml.gz', 'simple-fr-1.xml.gz', 'sitemap.xml'],
+            sorted(os.listdir(self.output_dir)))
+
+        index = self.read('sitemap.xml')
+        self.assertIn('<sitemap><loc>https://example.com/sitemaps/simple-en-1.xml.gz</loc>'
+                      '<lastmod>2019-01-01</lastmod></sitemap>', index)
+        self.assertIn('<sitemap><loc>https://example.com/sitemaps/simple-fr-1.xml.gz</loc></sitemap>', index)
+
+        for language in ['en', 'fr']:
+            content = self.read('simple-{0}-1.xml.gz'.format(language))
+            for simple in [self.simple1, self.simple2]:
+                self.assertIn('<loc>http://example.com{0}</loc>'.format(
+                    simple.get_absolute_url(language)), content)
+
+    def test_incremental(self):
+        self.write_sitemaps()
+        output = self.write_sitemaps()
+        self.assertIn('Skipped unchanged section simple-en', output)
+        # Sections without lastmod are always regenerated.
+        self.assertIn('Wrote section simple-fr (1 files)', output)
+
+        DatedSimpleSitemap.latest = date(2019, 2, 1)
+        try:
+            output = self.write_sitemaps()
+        finally:
+            DatedSimpleSitemap.latest = date(2019, 1, 1)
+        self.assertIn('Wrote section simple-en (1 files)', output)
+
+        output = self.write_sitemaps('--force')
+        self.assertIn('Wrote section simple-en (1 files)', output)
+
+        # Deleted items change the watermark too.
+        self.write_sitemaps()
+        self.simple2.delete()
+        output = self.write_sitemaps()
+        self.assertIn('Wrote section simple-en (1 files)', output)
+        self.assertNotIn('simple2', self.read('simple-en-1.xml.gz'))
+
+    def test_removes_stale_files(self):
+        self.write_sitemaps()
+        del SITEMAPS['simple-fr']
+        try:
+            self.write_sitemaps('--protocol', 'https', '--domain', 'example.org')
+        finally:
+            SITEMAPS['simple-fr'] = SimpleSitemap('fr')
+        self.assertEqual(['.sitemaps.json', 'simple-en-1.xml.gz', 'sitemap.xml'],
+                         sorted(os.listdir(self.output_dir)))
+        self.assertIn('<loc>https://example.org/en/', self.read('simple-en-1.xml.gz'))
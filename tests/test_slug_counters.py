@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from test_addon.models import Simple, Unconventional
+
+from aldryn_translation_tools.registry import SlugCounter
+from aldryn_translation_tools.slug_counters import (
+    CacheSlugCounters, DatabaseSlugCounters, LRUSlugCounters,
+)
+
+
+class SlugCountersTestMixin(object):
+
+    def get_counters(self):
+        raise NotImplementedError
+
+    def test_next_index(self):
+        counters = self.get_counters()
+        self.assertIsNone(counters.get_next_index(Simple, 'en', 'slug'))
+        counters.set_next_index(Simple, 'en', 'slug', 3)
+        self.assertEqual(3, counters.get_next_index(Simple, 'en', 'slug'))
+        self.assertIsNone(counters.get_next_index(Simple, 'de', 'slug'))
+        self.assertIsNone(counters.get_next_index(Simple, '', 'slug'))
+        self.assertIsNone(counters.get_next_index(Simple, 'en', 'other'))
+        self.assertIsNone(
+            counters.get_next_index(Unconventional, 'en', 'slug'))
+
+    def test_high_water_mark(self):
+        counters = self.get_counters()
+        counters.set_next_index(Simple, 'en', 'slug', 5)
+        counters.set_next_index(Simple, 'en', 'slug', 2)
+        self.assertEqual(5, counters.get_next_index(Simple, 'en', 'slug'))
+        counters.set_next_index(Simple, 'en', 'slug', 6)
+        self.assertEqual(6, counters.get_next_index(Simple, 'en', 'slug'))
+
+
+class TestLRUSlugCounters(SlugCountersTestMixin, TransactionTestCase):
+
+    def get_counters(self):
+        return LRUSlugCounters()
+
+    def test_max_size(self):
+        counters = LRUSlugCounters(max_size=2)
+        for slug in ['one', 'two', 'three']:
+            counters.set_next_index(Simple, 'en', slug, 1)
+        self.assertIsNone(counters.get_next_index(Simple, 'en', 'one'))
+        self.assertEqual(1, counters.get_next_index(Simple, 'en', 'three'))
+
+
+class TestCacheSlugCounters(SlugCountersTestMixin, TransactionTestCase):
+
+    def setUp(self):
+        super(TestCacheSlugCounters, self).setUp()
+        cache.clear()
+
+    def get_counters(self):
+        return CacheSlugCounters()
+
+
+class TestDatabaseSlugCounters(SlugCountersTestMixin, TransactionTestCase):
+
+    def get_counters(self):
+        return DatabaseSlugCounters()
+
+    def test_queries(self):
+        counters = self.get_counters()
+        ContentType.objects.get_for_model(Simple)
+        with self.assertNumQueries(1):
+            counters.get_next_index(Simple, 'en', 'slug')
+        counters.set_next_index(Simple, 'en', 'slug', 2)
+        with CaptureQueriesContext(connection) as context:
+            counters.set_next_index(Simple, 'en', 'slug', 3)
+        queries = [query['sql'] for query in context.captured_queries
+                   if query['sql'] != 'BEGIN']
+        self.assertEqual(1, len(queries))
+        self.assertTrue(queries[0].startswith('UPDATE'))
+        self.assertEqual(1, SlugCounter.objects.count())
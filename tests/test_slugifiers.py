@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import random
+import string
+from itertools import product
+
+from django.test import SimpleTestCase, override_settings
+
+from slugify import slugify as python_slugify
+from test_addon.models import Simple
+
+from aldryn_translation_tools.slugifiers import ascii_slugify, get_slugifier
+
+
+CORPUS = [
+    '', ' ', '-', '---', 'Simple one', '  leading and trailing  ',
+    'This is a test ---', "C'est déjà l'été.", "it's time", '1,000 and 2,5',
+    '1, 2', 'a,b', 'Ñøñ-ÅŠÇÏÎ', 'Компьютер', '影師嗎', 'jaja---lol-méméméoo--a',
+    'under_score', 'tab\tand\nnewline', 'one two three four five six',
+    'R&amp;D and &#38; &#x26; entities', 'Fish & Chips', '10 | 20 %',
+    'UPPER lower MiXeD', '--a--b--', 'i love 🦄', "'quoted'",
+]
+
+OPTIONS = list(product(
+    [0, 1, 5, 12, 100],  # max_length
+    [False, True],  # word_boundary
+    [False, True],  # save_order
+    ['-', '_', ''],  # separator
+))
+
+
+def random_ascii(rng):
+    length = rng.randint(0, 40)
+    chars = string.ascii_letters + string.digits + " -_',.&!?\t"
+    return ''.join(rng.choice(chars) for _ in range(length))
+
+
+class TestASCIISlugify(SimpleTestCase):
+
+    def assertSameSlugs(self, texts):
+        for text in texts:
+            for max_length, word_boundary, save_order, separator in OPTIONS:
+                kwargs = {
+                    'max_length': max_length,
+                    'word_boundary': word_boundary,
+                    'save_order': save_order,
+                    'separator': separator,
+                }
+                self.assertEqual(
+                    python_slugify(text, **kwargs),
+                    ascii_slugify(text, **kwargs),
+                    '{0!r} {1!r}'.format(text, kwargs))
+
+    def test_corpus(self):
+        self.assertSameSlugs(CORPUS)
+
+    def test_random_ascii(self):
+        rng = random.Random(16)
+        self.assertSameSlugs([random_ascii(rng) for _ in range(300)])
+
+
+class TestGetSlugifier(SimpleTestCase):
+
+    def setUp(self):
+        self.calls = []
+
+    def record(self, text, **kwargs):
+        self.calls.append(text)
+        return python_slugify(text, **kwargs)
+
+    def test_cached(self):
+        with override_settings(ALDRYN_TRANSLATION_TOOLS_SLUGIFIER=self.record):
+            slugify = get_slugifier()
+            self.assertEqual('simple-one', slugify('Simple one'))
+            self.assertEqual('simple-one', slugify('Simple one'))
+            self.assertEqual('simple', slugify('Simple one', max_length=6))
+            self.assertEqual(['Simple one', 'Simple one'], self.calls)
+            self.assertIs(slugify, get_slugifier())
+        self.assertIsNot(slugify, get_slugifier())
+
+    def test_cache_size(self):
+        with override_settings(ALDRYN_TRANSLATION_TOOLS_SLUGIFIER=self.record,
+                               ALDRYN_TRANSLATION_TOOLS_SLUGIFY_CACHE_SIZE=1):
+            slugify = get_slugifier()
+            slugify('one')
+            slugify('two')
+            slugify('one')
+            self.assertEqual(1, len(slugify.cache))
+        self.assertEqual(['one', 'two', 'one'], self.calls)
+
+        with override_settings(ALDRYN_TRANSLATION_TOOLS_SLUGIFIER=self.record,
+                               ALDRYN_TRANSLATION_TOOLS_SLUGIFY_CACHE_SIZE=0):
+            self.assertIs(self.record.__func__,
+                          get_slugifier().__func__)
+
+    @override_settings(ALDRYN_TRANSLATION_TOOLS_SLUGIFIER=(
+        'aldryn_translation_tools.slugifiers.ascii_slugify'))
+    def test_mixin(self):
+        simple = Simple(name='Déjà vu, 1,000 times')
+        self.assertEqual('deja-vu-1000-times', simple.slugify(simple.name))
+        self.assertEqual('deja-vu', simple.slugify(simple.name, max_length=8))
@@ -2,17 +2,19 @@
 
 from __future__ import unicode_literals
 
-import sys
+from copy import deepcopy
 
 from django.conf import settings
-from django.test import TransactionTestCase
-from django.urls import clear_url_caches, resolve, reverse
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.urls import resolve, reverse
 
-from cms.appresolver import clear_app_resolvers
+from test_addon.models import Historic, Simple, Untranslated
 
-from test_addon.models import Simple, Untranslated
-
-from aldryn_translation_tools.utils import get_admin_url, get_object_from_request
+from aldryn_translation_tools.utils import (
+    LRUCache, ObjectResolver, _get_object_version_key, get_admin_url, get_fallback_chain,
+    get_object_from_request, get_object_resolver,
+)
 
 from . import SimpleTransactionTestCase
 
@@ -70,20 +72,6 @@ class TestToolbarHelpers(SimpleTransactionTestCase):
         super(TestToolbarHelpers, self).setUp()
         self.reload_urls()
 
-    def reload_urls(self):
-        url_modules = [
-            'cms.urls',
-            'test_addon.urls',
-            settings.ROOT_URLCONF,
-        ]
-
-        clear_app_resolvers()
-        clear_url_caches()
-
-        for module in url_modules:
-            if module in sys.modules:
-                del sys.modules[module]
-
     def test_get_obj_from_request(self):
         """ Test that we can get the object from the request. """
         self.simple1.set_current_language('en')
@@ -127,3 +115,209 @@ class TestToolbarHelpers(SimpleTransactionTestCase):
             request.resolver_match = resolve(request.path)
             untranslated = get_object_from_request(Untranslated, request)
             self.assertTrue(untranslated.pk, self.untranslated1.pk)
+
+
+class TestObjectResolver(TransactionTestCase):
+
+    def test_get_object_resolver(self):
+        resolver = get_object_resolver(Simple)
+        self.assertIs(resolver, get_object_resolver(Simple))
+        self.assertIsNot(
+            resolver, get_object_resolver(Simple, slug_url_kwarg='name'))
+        self.assertIsInstance(resolver, ObjectResolver)
+
+    def test_slug_translated(self):
+        self.assertTrue(get_object_resolver(Simple).slug_translated)
+        self.assertFalse(get_object_resolver(Untranslated).slug_translated)
+        self.assertFalse(
+            get_object_resolver(Simple, slug_url_kwarg='title').slug_translated)
+
+    def test_get_lookup(self):
+        resolver = get_object_resolver(Simple)
+        self.assertEqual(('pk', '1', False), resolver.get_lookup({'pk': '1'}))
+        self.assertEqual(('slug', 'one', True),
+                         resolver.get_lookup({'slug': 'one'}))
+        self.assertIsNone(resolver.get_lookup({}))
+
+        resolver = ObjectResolver(Untranslated, pk_url_kwarg='id',
+                                  slug_field='name')
+        self.assertEqual(('pk', '1', False), resolver.get_lookup({'id': '1'}))
+        self.assertEqual(('name', 'one', False),
+                         resolver.get_lookup({'slug': 'one'}))
+
+    def test_fetch(self):
+        simple = Simple.objects.create(name='one', slug='one')
+        resolver = get_object_resolver(Simple)
+        with self.assertNumQueries(1):
+            self.assertEqual(simple, resolver.fetch('en', ('slug', 'one', True)))
+        with self.assertNumQueries(1):
+            self.assertIsNone(resolver.fetch('de', ('slug', 'one', True)))
+
+    def test_fetch_from_history(self):
+        historic = Historic.objects.create(name='one')
+        historic.slug = 'two'
+        historic.save()
+        resolver = get_object_resolver(Historic)
+        self.assertTrue(resolver.slug_history)
+        self.assertFalse(get_object_resolver(Simple).slug_history)
+        self.assertEqual(historic, resolver.fetch('en', ('slug', 'two', True)))
+        # The current slug, then the history.
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                historic, resolver.fetch('en', ('slug', 'one', True)))
+        with self.assertNumQueries(2):
+            self.assertIsNone(resolver.fetch('de', ('slug', 'one', True)))
+
+        # Current slugs take precedence.
+        other = Historic.objects.create(name='one')
+        self.assertEqual('one', other.slug)
+        self.assertEqual(other, resolver.fetch('en', ('slug', 'one', True)))
+
+
+class TestObjectCache(SimpleTransactionTestCase):
+
+    def setUp(self):
+        super(TestObjectCache, self).setUp()
+        self.reload_urls()
+        cache.clear()
+        # CMSRequestBasedTest.setUpClass() does not apply class decorators.
+        cache_settings = override_settings(
+            ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE=True)
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+
+    def get_object_request(self, url):
+        request = self.request_factory.get(url)
+        request.LANGUAGE_CODE = 'en'
+        request.current_page = self.page
+        request.user = self.user
+        request.resolver_match = resolve(request.path)
+        return request
+
+    def test_request_memo(self):
+        request = self.get_object_request(self.simple1.get_absolute_url('en'))
+        with self.assertNumQueries(1):
+            simple = get_object_from_request(Simple, request)
+        with self.assertNumQueries(0):
+            self.assertIs(simple, get_object_from_request(Simple, request))
+        self.assertEqual(self.simple1.pk, simple.pk)
+
+    def test_cache(self):
+        self.simple1.set_current_language('en')
+        url = self.simple1.get_absolute_url('en')
+        pk_url = url.replace(
+            '/{0}/'.format(self.simple1.slug), '/{0}/'.format(self.simple1.pk))
+        for lookup_url in [url, pk_url]:
+            get_object_from_request(Simple, self.get_object_request(lookup_url))
+            with self.assertNumQueries(0):
+                simple = get_object_from_request(
+                    Simple, self.get_object_request(lookup_url))
+            self.assertEqual(self.simple1.pk, simple.pk)
+
+        # Missing objects are cached too.
+        missing_url = url.replace(self.simple1.slug, 'missing')
+        self.assertIsNone(get_object_from_request(
+            Simple, self.get_object_request(missing_url)))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_object_from_request(
+                Simple, self.get_object_request(missing_url)))
+
+    def test_invalidation(self):
+        url = self.simple1.get_absolute_url('en')
+        request = self.get_object_request(url)
+        self.assertEqual('Simple one',
+                         get_object_from_request(Simple, request).name)
+
+        # Changing a translation invalidates the memo and the cache.
+        self.simple1.set_current_language('en')
+        self.simple1.name = 'Simple uno'
+        self.simple1.save()
+        self.assertEqual('Simple uno',
+                         get_object_from_request(Simple, request).name)
+        self.assertEqual('Simple uno', get_object_from_request(
+            Simple, self.get_object_request(url)).name)
+
+        self.simple1.delete()
+        self.assertIsNone(get_object_from_request(Simple, request))
+        self.assertIsNone(get_object_from_request(
+            Simple, self.get_object_request(url)))
+
+    def test_invalidation_without_resolving(self):
+        # Objects changed by processes which never resolved their model, e.g.
+        # the admin, invalidate the objects cached by the others.
+        key = _get_object_version_key(Historic)
+        cache.set(key, 5, None)
+        historic = Historic.objects.create(name='brand new')
+        version = cache.get(key)
+        self.assertGreater(version, 5)
+        historic.set_current_language('en')
+        historic.name = 'renamed'
+        historic.save_translation(historic._get_translated_model())
+        self.assertGreater(cache.get(key), version)
+
+    @override_settings(ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE=False)
+    def test_disabled_invalidation(self):
+        key = _get_object_version_key(Historic)
+        cache.set(key, 5, None)
+        Historic.objects.create(name='brand new')
+        self.assertEqual(5, cache.get(key))
+
+    @override_settings(ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE_ALIAS=None)
+    def test_without_cache_backend(self):
+        url = self.simple1.get_absolute_url('en')
+        request = self.get_object_request(url)
+        get_object_from_request(Simple, request)
+        with self.assertNumQueries(0):
+            get_object_from_request(Simple, request)
+        with self.assertNumQueries(1):
+            get_object_from_request(Simple, self.get_object_request(url))
+
+    @override_settings(ALDRYN_TRANSLATION_TOOLS_OBJECT_CACHE=False)
+    def test_disabled(self):
+        request = self.get_object_request(self.simple1.get_absolute_url('en'))
+        get_object_from_request(Simple, request)
+        with self.assertNumQueries(1):
+            get_object_from_request(Simple, request)
+
+
+class TestLRUCache(TransactionTestCase):
+
+    def test_lru_cache(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        # 'b' is now the least recently used item.
+        cache.set('c', 3)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(0, cache.get('b', 0))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+
+class TestFallbackChain(TransactionTestCase):
+
+    def test_get_fallback_chain(self):
+        chain = get_fallback_chain('en')
+        self.assertEqual(('en', 'de', 'fr'), chain.languages)
+        self.assertEqual({'en': 0, 'de': 1, 'fr': 2}, chain.ranks)
+        self.assertIs(chain, get_fallback_chain('en', site_id=1))
+        self.assertEqual(('it', 'fr'), get_fallback_chain('it').languages)
+
+    def test_first_available(self):
+        chain = get_fallback_chain('en')
+        self.assertEqual('de', chain.first_available(['fr', 'de', 'it']))
+        self.assertEqual('fr', chain.first_available(['it', 'fr']))
+        self.assertIsNone(chain.first_available(['it']))
+        self.assertIsNone(chain.first_available([]))
+
+    def test_settings_change_clears_cache(self):
+        self.assertEqual(('de', 'en'), get_fallback_chain('de').languages)
+        cms_languages = deepcopy(settings.CMS_LANGUAGES)
+        cms_languages[1][0]['fallbacks'] = ['fr']
+        with self.settings(CMS_LANGUAGES=cms_languages):
+            self.assertEqual(('de', 'fr'), get_fallback_chain('de').languages)
+        self.assertEqual(('de', 'en'), get_fallback_chain('de').languages)